@@ -0,0 +1,225 @@
+# Cless TP/SL — historical backtest of the stop/target rules (no Qt)
+# ----------------------------------------------------------------
+# Applies the app's levels (same stop_pct/target_pct meaning and tick
+# rounding as stop_price_and_risk/target_price, Long and Short) to OHLC
+# bars and finds, for every entry, the first bar that touches the stop
+# or the target. Result: one R per trade.
+#
+# Bars are memory-mapped, never loaded whole:
+#   bars.npy                structured (open/high/low/close fields) or
+#                           a 2-D array with columns O, H, L, C
+#   bars/                   a directory of flat columns: open.npy,
+#                           high.npy, ... or raw open.f8 / open.f4 ...
+#
+# Fills: entry at the signal bar's close; exits at the level, or at the
+# open when a bar gaps through it. If one bar touches both, the stop is
+# assumed first. Trades still open after max_hold bars (or at the end of
+# the data) exit at that bar's close.
+#
+# Run:  python tpslbacktest.py bars.npy --every 30 --stop -1 --target 2 --max-hold 390
+# ----------------------------------------------------------------
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+import tpslcore as core
+
+WINDOW = 64              # bars scanned in the first pass; doubled for trades still open
+CELLS = 4_000_000        # trades × bars gathered per pass (bounds memory)
+COLUMNS = ("open", "high", "low", "close")
+
+
+class Bars:
+    """open/high/low/close as read-only memory maps of equal length."""
+    def __init__(self, open, high, low, close):
+        # plain ndarray views of the maps: same pages, no memmap subclass overhead per gather
+        self.open, self.high, self.low, self.close = (np.asarray(c) for c in (open, high, low, close))
+        if not (len(open) == len(high) == len(low) == len(close)):
+            raise ValueError("OHLC columns differ in length")
+
+    def __len__(self):
+        return len(self.close)
+
+
+def load_bars(path):
+    """Memory-map bars from a .npy file or a directory of column files (see header)."""
+    if os.path.isdir(path):
+        cols = []
+        for name in COLUMNS:
+            for ext, dtype in ((".npy", None), (".f8", np.float64), (".f4", np.float32)):
+                p = os.path.join(path, name + ext)
+                if os.path.exists(p):
+                    cols.append(np.load(p, mmap_mode="r") if dtype is None else np.memmap(p, dtype=dtype, mode="r"))
+                    break
+            else:
+                raise ValueError(f"{path}: no {name}.npy / {name}.f8 / {name}.f4")
+        return Bars(*cols)
+
+    arr = np.load(path, mmap_mode="r")
+    if arr.dtype.names:
+        fields = {n.lower(): n for n in arr.dtype.names}
+        missing = [c for c in COLUMNS if c not in fields]
+        if missing:
+            raise ValueError(f"{path}: missing fields {missing}")
+        return Bars(*(arr[fields[c]] for c in COLUMNS))
+    if arr.ndim == 2 and arr.shape[1] >= 4:
+        return Bars(*(arr[:, j] for j in range(4)))
+    raise ValueError(f"{path}: expected OHLC fields or an (n, 4) array, got shape {arr.shape}")
+
+
+def _first(hit, width):
+    """Column of the first True in each row, or width when the row has none."""
+    first = hit.argmax(1)
+    return np.where(hit[np.arange(len(hit)), first], first, width)
+
+
+def _scan(bars, idx0, long, stop, target, start, width):
+    """Look at bars idx0+start .. idx0+start+width-1 for every trade (all one side) at once.
+
+    Returns (offset of first hit or -1, outcome 1=target/-1=stop/0=none, exit price).
+    """
+    n = len(bars)
+    idx = idx0[:, None] + np.arange(start, start + width)[None, :]
+    inside = idx < n
+    np.minimum(idx, n - 1, out=idx)
+    hi, lo = bars.high[idx], bars.low[idx]
+
+    if long:
+        hit_s, hit_t = lo <= stop[:, None], hi >= target[:, None]
+    else:
+        hit_s, hit_t = hi >= stop[:, None], lo <= target[:, None]
+    first_s = _first(hit_s & inside, width)
+    first_t = _first(hit_t & inside, width)
+
+    stop_wins = (first_s <= first_t) & (first_s < width)      # same bar → stop first
+    tgt_wins = first_t < first_s
+    first = np.where(stop_wins, first_s, np.where(tgt_wins, first_t, -1))
+    outcome = np.where(stop_wins, -1, np.where(tgt_wins, 1, 0))
+
+    # gap through the level: filled at the open, which is past it
+    o = bars.open[np.minimum(idx0 + start + np.maximum(first, 0), n - 1)]
+    stop_px = np.minimum(stop, o) if long else np.maximum(stop, o)
+    tgt_px = np.maximum(target, o) if long else np.minimum(target, o)
+    exit_px = np.where(outcome == -1, stop_px, np.where(outcome == 1, tgt_px, np.nan))
+    return np.where(first >= 0, first + start, -1), outcome, exit_px
+
+
+def backtest(bars, entry_idx, side="Long", stop_pct=-0.04, tgt_pct=0.08, tick=0.01, max_hold=None):
+    """First stop/target hit for every entry → dict of per-trade arrays.
+
+    entry_idx: bar indices of the signals (entry at that bar's close).
+    side/stop_pct/tgt_pct/tick: scalars or per-trade arrays; pct are fractions
+    like core.plan(). max_hold: bars to wait before exiting at the close
+    (None = until the end of the data).
+    """
+    n = len(bars)
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    keep = (entry_idx >= 0) & (entry_idx < n - 1)   # need at least one bar after entry
+
+    def per_trade(a):
+        a = np.asarray(a)
+        return a[keep] if a.ndim else a
+    entry_idx, side, stop_pct, tgt_pct, tick = (per_trade(a) for a in (entry_idx, side, stop_pct, tgt_pct, tick))
+    m = len(entry_idx)
+    long = np.broadcast_to(core.side_mask(side), (m,))
+    entry = np.asarray(bars.close[entry_idx], dtype=np.float64)
+    stop, per_risk, target = core.levels_batch(entry, tick, long, stop_pct, tgt_pct)
+    stop, per_risk, target = (np.broadcast_to(a, (m,)) for a in (stop, per_risk, target))
+
+    horizon = (n - 1) if max_hold is None else max_hold
+    exit_off = np.full(m, -1, dtype=np.int64)
+    outcome = np.zeros(m, dtype=np.int8)
+    exit_px = np.full(m, np.nan)
+
+    open_ = np.arange(m)      # trades not resolved yet
+    start, width = 1, WINDOW
+    while len(open_) and start <= horizon:
+        width = min(width, horizon - start + 1)
+        step = max(1, CELLS // width)
+        for is_long in (True, False):
+            side_open = open_[long[open_] == is_long]
+            for k in range(0, len(side_open), step):
+                sel = side_open[k:k + step]
+                off, out, px = _scan(bars, entry_idx[sel], is_long, stop[sel], target[sel], start, width)
+                exit_off[sel], outcome[sel], exit_px[sel] = off, out, px
+        open_ = open_[outcome[open_] == 0]
+        open_ = open_[entry_idx[open_] + start + width < n]   # nothing left to scan
+        start += width
+        width *= 2
+
+    # never hit: exit at the close after max_hold bars, or the last bar
+    timed_out = outcome == 0
+    last = np.minimum(entry_idx + horizon, n - 1)
+    exit_off[timed_out] = (last - entry_idx)[timed_out]
+    exit_px[timed_out] = bars.close[last[timed_out]]
+
+    sign = np.where(long, 1.0, -1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        R = np.where(per_risk > 0, (exit_px - entry) * sign / per_risk, np.nan)
+    return {
+        "entry_idx": entry_idx, "entry": entry, "stop": np.array(stop), "target": np.array(target),
+        "exit_idx": entry_idx + exit_off, "exit": exit_px, "outcome": outcome, "R": R,
+    }
+
+
+def summarize(result, bins=20):
+    """Distribution of per-trade R: counts, win rate, mean/percentiles and a histogram."""
+    R = result["R"][np.isfinite(result["R"])]
+    out = result["outcome"]
+    if not len(R):
+        return {"trades": 0}
+    counts, edges = np.histogram(R, bins=bins)
+    pct = np.percentile(R, [5, 25, 50, 75, 95])
+    return {
+        "trades": int(len(R)),
+        "targets": int((out == 1).sum()), "stops": int((out == -1).sum()), "timeouts": int((out == 0).sum()),
+        "win_rate": float((R > 0).mean()),
+        "mean_R": float(R.mean()), "std_R": float(R.std()),
+        "p5_R": float(pct[0]), "p25_R": float(pct[1]), "median_R": float(pct[2]),
+        "p75_R": float(pct[3]), "p95_R": float(pct[4]),
+        "total_R": float(R.sum()),
+        "hist": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="tpslbacktest", description="Backtest TP/SL rules over memory-mapped OHLC bars.")
+    ap.add_argument("bars", help=".npy file or directory of column files")
+    g = ap.add_mutually_exclusive_group()
+    g.add_argument("--every", type=int, default=1, help="enter at every Nth bar (default 1)")
+    g.add_argument("--entries", help=".npy or text file of entry bar indices")
+    ap.add_argument("--side", default=core.DEFAULTS["side"], choices=["Long", "Short"])
+    ap.add_argument("--stop", type=float, default=core.DEFAULTS["stop_pct"], help="stop %% from entry, as on the slider")
+    ap.add_argument("--target", type=float, default=core.DEFAULTS["target_pct"], help="target %% from entry")
+    ap.add_argument("--tick", type=float, default=core.DEFAULTS["tick"])
+    ap.add_argument("--max-hold", type=int, default=None, help="bars before a time exit (default: none)")
+    ap.add_argument("--out", help="write per-trade results here (.npy structured or .csv)")
+    args = ap.parse_args(argv)
+
+    bars = load_bars(args.bars)
+    if args.entries:
+        entries = np.load(args.entries) if args.entries.endswith(".npy") else np.loadtxt(args.entries, dtype=np.int64, ndmin=1)
+    else:
+        entries = np.arange(0, len(bars), max(1, args.every))
+    res = backtest(bars, entries, args.side, args.stop / 100, args.target / 100, args.tick, args.max_hold)
+
+    if args.out:
+        names = list(res)
+        if args.out.endswith(".npy"):
+            rec = np.empty(len(res["R"]), dtype=[(k, res[k].dtype) for k in names])
+            for k in names: rec[k] = res[k]
+            np.save(args.out, rec)
+        else:
+            np.savetxt(args.out, np.column_stack([res[k] for k in names]), delimiter=",",
+                       header=",".join(names), comments="", fmt="%.10g")
+    json.dump(summarize(res), sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
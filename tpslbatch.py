@@ -0,0 +1,224 @@
+# Cless TP/SL — headless batch planner (no Qt)
+# ----------------------------------------------------------------
+# Run:  python tpslbatch.py setups.csv -o plan.csv
+#       python tpslbatch.py setups.parquet -o plan.parquet   (needs pyarrow)
+#       python tpslcalculator.py --batch setups.csv > plan.csv
+#
+# Input columns (any missing one takes its DEFAULTS value; a missing
+# current is the entry, i.e. a setup not yet entered):
+#   entry, current, shares, tick, side, stop_pct, target_pct,
+#   flat_fee, per_share_fee
+# A CSV row with the wrong number of fields, a value that is not a finite
+# number, or a side other than Long/Short is skipped and reported on
+# stderr with its line number; the exit status is then 1.
+# stop_pct / target_pct are percents, like the saved settings (-4 = -4 %).
+# Every input column is passed through; the plan columns are appended.
+# Rows are streamed in fixed-size chunks, so memory stays flat.
+# ----------------------------------------------------------------
+
+import argparse
+import csv
+import math
+import sys
+
+import numpy as np
+
+import tpslcore as core
+
+CHUNK_ROWS = 65536
+FLOAT_FORMAT = "%.10g"   # CSV output; None writes full repr precision
+
+NUMERIC_INPUTS = ("entry", "current", "shares", "tick", "stop_pct", "target_pct", "flat_fee", "per_share_fee")
+
+OUTPUT_COLUMNS = (
+    "stop", "target", "stop_move_pct", "target_move_pct",
+    "risk", "reward", "R", "RR", "unreal_gross", "unreal_net", "breakeven",
+    "stop_t", "target_t", "breakeven_t",
+)
+
+
+def plan_chunk(cols, n, keys=OUTPUT_COLUMNS):
+    """One chunk of input columns (name → sequence of n values) → dict of plan arrays.
+    keys: the plan columns to return (None = every plan_batch key, as plan() has)."""
+    def num(name, scale=1.0):
+        if name in cols:
+            return np.asarray(cols[name], dtype=np.float64) * scale
+        return np.full(n, core.DEFAULTS[name] * scale)
+
+    entry = num("entry")
+
+    side = np.asarray(cols["side"]) if "side" in cols else core.DEFAULTS["side"]
+    res = core.plan_batch(
+        entry, num("current") if "current" in cols else entry, num("shares"), num("tick"), side,
+        num("stop_pct", 0.01), num("target_pct", 0.01),
+        num("flat_fee"), num("per_share_fee"),
+    )
+    return res if keys is None else {k: res[k] for k in keys}
+
+
+# ---------- readers: (column names, iterator of (n, {name: values})) ----------
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet support needs pyarrow:  pip install pyarrow")
+    return pa, pq
+
+
+def _skip_row(line, reason):
+    print(f"tpslbatch: line {line}: {reason}; row skipped", file=sys.stderr)
+
+
+def _bad_field(header, row):
+    """Why a CSV row can't be planned, or None."""
+    if len(row) != len(header):
+        return f"expected {len(header)} fields, got {len(row)}"
+    for name, value in zip(header, row):
+        if name in NUMERIC_INPUTS:
+            try:
+                x = float(value)
+            except ValueError:
+                return f"{name}: not a number: {value!r}"
+            if not math.isfinite(x):
+                return f"{name}: not a finite number: {value!r}"
+        elif name == "side" and value.strip()[:1].lower() not in ("l", "s"):
+            return f"side: expected Long or Short, got {value!r}"
+    return None
+
+
+def read_csv_chunks(f, chunk_rows, on_bad=_skip_row):
+    """on_bad(line, reason) is called for each row that is skipped (see _bad_field)."""
+    reader = csv.reader(f)
+    header = next(reader, None) or []
+
+    def chunks():
+        rows = []
+        end = reader.line_num
+        for row in reader:
+            line, end = end + 1, reader.line_num   # a quoted field may span lines: report the first
+            if not row: continue
+            reason = _bad_field(header, row)
+            if reason:
+                on_bad(line, reason)
+                continue
+            rows.append(row)
+            if len(rows) >= chunk_rows:
+                yield len(rows), dict(zip(header, zip(*rows)))
+                rows = []
+        if rows:
+            yield len(rows), dict(zip(header, zip(*rows)))
+
+    return header, chunks()
+
+
+def read_parquet_chunks(path, chunk_rows):
+    _, pq = _pyarrow()
+    pf = pq.ParquetFile(path)
+    names = pf.schema_arrow.names
+
+    def chunks():
+        for batch in pf.iter_batches(batch_size=chunk_rows):
+            yield batch.num_rows, {name: batch.column(i).to_numpy(zero_copy_only=False)
+                                   for i, name in enumerate(batch.schema.names)}
+
+    return names, chunks()
+
+
+# ---------- writers ----------
+def _as_list(v):
+    return v.tolist() if hasattr(v, "tolist") else v
+
+
+def _passthrough(names):
+    # a re-planned plan file gets fresh output columns, not duplicates
+    return [c for c in names if c not in OUTPUT_COLUMNS]
+
+
+def write_csv(f, names, chunks, float_format=FLOAT_FORMAT):
+    names = _passthrough(names)
+    fmt = (lambda a: [float_format % x for x in a.tolist()] if a.dtype.kind == "f" else a.tolist()) \
+        if float_format else (lambda a: a.tolist())
+    w = csv.writer(f, lineterminator="\n")
+    w.writerow(names + list(OUTPUT_COLUMNS))
+    rows = 0
+    for n, cols, out in chunks:
+        w.writerows(zip(*(_as_list(cols[c]) for c in names), *(fmt(out[c]) for c in OUTPUT_COLUMNS)))
+        rows += n
+    return rows
+
+
+def write_parquet(path, names, chunks):
+    pa, pq = _pyarrow()
+    names = _passthrough(names)
+    writer = None
+    rows = 0
+    try:
+        for n, cols, out in chunks:
+            arrays = [pa.array(np.asarray(cols[c], dtype=np.float64) if c in NUMERIC_INPUTS else _as_list(cols[c]))
+                      for c in names]
+            arrays += [pa.array(out[c]) for c in OUTPUT_COLUMNS]
+            batch = pa.RecordBatch.from_arrays(arrays, names=names + list(OUTPUT_COLUMNS))
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema)
+            writer.write_batch(batch)
+            rows += n
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def _is_parquet(path):
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def run(src, dst="-", chunk_rows=CHUNK_ROWS, float_format=FLOAT_FORMAT, on_bad=_skip_row):
+    """Stream src → dst ('-' = stdin/stdout CSV). Returns the number of rows planned.
+    on_bad(line, reason): called for each CSV row that is skipped."""
+    close = []
+    try:
+        if _is_parquet(src):
+            names, chunks = read_parquet_chunks(src, chunk_rows)
+        else:
+            f = sys.stdin if src == "-" else open(src, newline="", encoding="utf-8")
+            if f is not sys.stdin: close.append(f)
+            names, chunks = read_csv_chunks(f, chunk_rows, on_bad)
+
+        planned = ((n, cols, plan_chunk(cols, n)) for n, cols in chunks)
+
+        if dst != "-" and _is_parquet(dst):
+            return write_parquet(dst, names, planned)
+        out = sys.stdout if dst == "-" else open(dst, "w", newline="", encoding="utf-8")
+        if out is not sys.stdout: close.append(out)
+        return write_csv(out, names, planned, float_format)
+    finally:
+        for f in close:
+            f.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="tpslbatch", description="Plan TP/SL levels for a file of trade setups.")
+    ap.add_argument("input", help="CSV or .parquet of setups ('-' reads CSV from stdin)")
+    ap.add_argument("-o", "--output", default="-", help="CSV or .parquet to write ('-' = stdout, the default)")
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help=f"rows per chunk (default {CHUNK_ROWS})")
+    ap.add_argument("--float-format", default=FLOAT_FORMAT,
+                    help=f"printf format for CSV plan columns (default {FLOAT_FORMAT!r}; '' = full precision)")
+    args = ap.parse_args(argv)
+    skipped = []
+
+    def on_bad(line, reason):
+        skipped.append(line)
+        _skip_row(line, reason)
+
+    try:
+        rows = run(args.input, args.output, max(1, args.chunk_rows), args.float_format or None, on_bad)
+    except (OSError, ValueError) as e:
+        print(f"tpslbatch: {e}", file=sys.stderr)
+        return 2
+    print(f"tpslbatch: planned {rows} rows" + (f", skipped {len(skipped)}" if skipped else ""), file=sys.stderr)
+    return 1 if skipped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+# Cless TP/SL — benchmark suite (headless)
+# ----------------------------------------------------------------
+# Run:  QT_QPA_PLATFORM=offscreen python tpslbench.py -o bench.json
+#       python tpslbench.py --quick --compare bench.json      # ratios vs an older run
+#
+# Sections (--only math,batch,render,recalc,startup):
+#   math     scalar stop_price_and_risk / target_price / breakeven_price / plan
+#   batch    plan_batch and levels_batch over N random setups (fixed seed)
+#   render   ProfitBar.paintEvent into a QImage per size and device pixel
+#            ratio: "tick" = only the price moved (cached layers), "full" =
+#            levels moved (layers rebuilt). Each DPR runs in a child process
+#            with QT_SCALE_FACTOR set, so the widget really is at that DPR.
+#   recalc   one slider step → recalc → overlay push, released and dragging
+#   startup  launch → first painted TPSLWidget (--startup-time), fresh interpreters
+#
+# Timings are per call; "best" is the fastest of the repeats, "median"
+# the typical one. Compare runs on the same machine only.
+# ----------------------------------------------------------------
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+import tpslcore as core
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SECTIONS = ("math", "batch", "render", "recalc", "startup")
+SIZES = ((64, 240), (120, 480), (200, 900))
+DPRS = (1.0, 2.0)
+REPEAT = 5
+
+SETUP = dict(entry=115.0, current=119.72, shares=100, tick=0.01, long=True, stop_pct=-0.04, tgt_pct=0.08)
+
+
+def _per_call(fn, repeat=REPEAT, min_time=0.1):
+    """timeit-style: calls per loop from autorange, then `repeat` loops → per-call µs."""
+    t = timeit.Timer(fn)
+    number, _ = t.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = [s / number * 1e6 for s in t.repeat(repeat, number)]
+    return {"best_us": min(runs), "median_us": statistics.median(runs), "calls": number * repeat}
+
+
+def _seconds(fn, repeat=3):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); runs.append(time.perf_counter() - t0)
+    return min(runs), statistics.median(runs)
+
+
+# ---------- math ----------
+def bench_math():
+    s = SETUP
+    return {
+        "stop_price_and_risk": _per_call(lambda: core.stop_price_and_risk(s["entry"], s["stop_pct"], s["long"], s["tick"])),
+        "target_price": _per_call(lambda: core.target_price(s["entry"], s["tgt_pct"], s["long"], s["tick"])),
+        "breakeven_price": _per_call(lambda: core.breakeven_price(s["entry"], s["shares"], 2.0, s["long"], s["tick"])),
+        "plan": _per_call(lambda: core.plan(**s, flat_fee=1.0, ps_fee=0.01)),
+    }
+
+
+def bench_batch(rows):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    entry = rng.uniform(1, 500, rows).round(2)
+    cols = dict(
+        entry=entry, current=entry * rng.uniform(0.9, 1.1, rows), shares=rng.integers(1, 1000, rows).astype(float),
+        tick=rng.choice([0.01, 0.05, 0.1], rows), side=rng.choice(["Long", "Short"], rows),
+        stop_pct=rng.uniform(-0.1, -0.005, rows), tgt_pct=rng.uniform(0.005, 0.2, rows),
+    )
+    out = {"rows": rows}
+    best, med = _seconds(lambda: core.plan_batch(**cols, flat_fee=1.0, ps_fee=0.01))
+    out["plan_batch"] = {"best_s": best, "median_s": med, "rows_per_s": rows / best}
+    long = core.side_mask(cols["side"])
+    best, med = _seconds(lambda: core.levels_batch(cols["entry"], cols["tick"], long, cols["stop_pct"], cols["tgt_pct"]))
+    out["levels_batch"] = {"best_s": best, "median_s": med, "rows_per_s": rows / best}
+    return out
+
+
+# ---------- Qt sections ----------
+def _app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([sys.argv[0]])
+
+
+def bench_render_here(sizes, quick):
+    """ProfitBar at this process's DPR (child side of bench_render)."""
+    app = _app()
+    from PyQt5.QtGui import QImage
+    import tpslcalculator as gui
+    dpr = app.devicePixelRatio()
+    out = {}
+    for w, h in sizes:
+        bar = gui.ProfitBar()
+        bar.resize(w, h)
+        bar.setValues(115.0, 110.4, 124.2, 119.72, True)
+        img = QImage(int(w * dpr), int(h * dpr), QImage.Format_ARGB32_Premultiplied)
+        img.setDevicePixelRatio(dpr)
+        bar.render(img)   # warm: fonts, gradient, first layer build
+        prices = [110.5 + i * 0.01 for i in range(1300)]
+        i = [0]
+
+        def tick():
+            bar.current = prices[i[0] % len(prices)]; i[0] += 1
+            bar.render(img)
+
+        def full():
+            bar.stop = 110.0 + (i[0] % 40) * 0.01; i[0] += 1
+            bar.render(img)
+        repeat = 3 if quick else REPEAT
+        out[f"{w}x{h}"] = {"tick": _per_call(tick, repeat), "full": _per_call(full, repeat)}
+    return {"dpr": dpr, "sizes": out}
+
+
+def bench_render(sizes, dprs, quick):
+    """One child per DPR: QT_SCALE_FACTOR is process-wide and fixed at QApplication start."""
+    out = {}
+    for dpr in dprs:
+        env = dict(os.environ, QT_QPA_PLATFORM="offscreen", QT_SCALE_FACTOR=str(dpr))
+        cmd = [sys.executable, os.path.abspath(__file__), "--render-child",
+               "--sizes", ",".join(f"{w}x{h}" for w, h in sizes)] + (["--quick"] if quick else [])
+        p = subprocess.run(cmd, env=env, cwd=HERE, capture_output=True, text=True)
+        if p.returncode != 0:
+            out[f"dpr{dpr:g}"] = {"error": p.stderr.strip().splitlines()[-1:] or ["failed"]}
+            continue
+        out[f"dpr{dpr:g}"] = json.loads(p.stdout)["sizes"]
+    return out
+
+
+def bench_recalc(quick):
+    """Per slider step: setValue → coalesced recalc → overlay push, with the overlay shown."""
+    app = _app()
+    import tpslcalculator as gui
+    w = gui.TPSLWidget()
+    w.reset_defaults()
+    w.show(); w.toggle_overlay()
+    app.processEvents()
+    sld = w.sld_stop
+    steps = list(range(sld.minimum(), sld.maximum() + 1, 1 if not quick else 5))
+
+    def sweep(drag):
+        sld.setSliderDown(drag)
+        r0, e0 = w.recalc_requested, w.recalc_executed
+        t0 = time.perf_counter()
+        for v in steps:
+            sld.setValue(v)
+            app.processEvents()
+        dt = time.perf_counter() - t0
+        sld.setSliderDown(False)
+        return {"per_step_us": dt / len(steps) * 1e6, "steps": len(steps),
+                "recalcs_requested": w.recalc_requested - r0, "recalcs_executed": w.recalc_executed - e0}
+
+    sweep(False)   # warm: slider tables, layers
+    out = {"released": sweep(False), "dragging": sweep(True)}
+    w.overlay.hide(); w.close()
+    app.processEvents()
+    return out
+
+
+def bench_startup(runs):
+    """Fresh interpreter each run via tpslcalculator.py --startup-time (launch → first painted frame)."""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    cmd = [sys.executable, os.path.join(HERE, "tpslcalculator.py"), "--startup-time"]
+    wall, marks = [], []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        p = subprocess.run(cmd, env=env, cwd=HERE, capture_output=True, text=True)
+        wall.append((time.perf_counter() - t0) * 1000)
+        if p.returncode != 0 or not p.stdout.strip():
+            return {"error": p.stderr.strip().splitlines()[-1:] or ["failed"]}
+        marks.append(json.loads(p.stdout.strip().splitlines()[-1]))
+    out = {"runs": runs, "wall": {"best_ms": min(wall), "median_ms": statistics.median(wall)}}
+    for k in marks[0]:   # imports_ms, app_ms, widget_ms, first_frame_ms since interpreter start
+        xs = [m[k] for m in marks]
+        out[k[:-3]] = {"best_ms": min(xs), "median_ms": statistics.median(xs)}
+    return out
+
+
+# ---------- report ----------
+def _meta():
+    meta = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+        "platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count(),
+    }
+    try:
+        import numpy
+        meta["numpy"] = numpy.__version__
+        from PyQt5.QtCore import QT_VERSION_STR, PYQT_VERSION_STR
+        meta["qt"], meta["pyqt"] = QT_VERSION_STR, PYQT_VERSION_STR
+    except ImportError:
+        pass
+    try:
+        meta["git"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                     capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        meta["git"] = None
+    return meta
+
+
+def _leaves(d, prefix=""):
+    for k, v in d.items():
+        if isinstance(v, dict):
+            yield from _leaves(v, f"{prefix}{k}.")
+        elif isinstance(v, (int, float)) and k.startswith(("best_", "per_step", "rows_per_s")):
+            yield prefix + k, v
+
+
+def compare(new, old):
+    """Lines of 'metric  old → new  ratio' for every timing present in both runs."""
+    before = dict(_leaves(old.get("results", {})))
+    lines = []
+    for key, v in _leaves(new["results"]):
+        if key in before and before[key]:
+            ratio = v / before[key]
+            lines.append(f"{key:60s} {before[key]:12.4g} → {v:12.4g}  ×{ratio:.2f}")
+    return lines
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="tpslbench", description="Benchmark TP/SL math, rendering, recalc and startup.")
+    ap.add_argument("-o", "--output", default="-", help="JSON file to write ('-' = stdout, the default)")
+    ap.add_argument("--only", default=",".join(SECTIONS), help=f"comma list of sections ({','.join(SECTIONS)})")
+    ap.add_argument("--rows", type=int, default=1_000_000, help="setups for the batch section")
+    ap.add_argument("--dpr", default=",".join(f"{d:g}" for d in DPRS), help="device pixel ratios to render at")
+    ap.add_argument("--sizes", default=",".join(f"{w}x{h}" for w, h in SIZES), help="ProfitBar sizes, WxH list")
+    ap.add_argument("--startup-runs", type=int, default=5)
+    ap.add_argument("--quick", action="store_true", help="fewer repeats and rows, for a smoke run")
+    ap.add_argument("--compare", help="earlier JSON to print ratios against (stderr)")
+    ap.add_argument("--render-child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    sizes = [tuple(int(x) for x in s.split("x")) for s in args.sizes.split(",") if s]
+    if args.render_child:
+        json.dump(bench_render_here(sizes, args.quick), sys.stdout)
+        return 0
+
+    only = [s.strip() for s in args.only.split(",") if s.strip()]
+    unknown = set(only) - set(SECTIONS)
+    if unknown:
+        ap.error(f"unknown sections: {', '.join(sorted(unknown))}")
+    rows = min(args.rows, 100_000) if args.quick else args.rows
+
+    results = {}
+    for name in only:
+        print(f"tpslbench: {name}…", file=sys.stderr)
+        if name == "math":
+            results[name] = bench_math()
+        elif name == "batch":
+            results[name] = bench_batch(rows)
+        elif name == "render":
+            results[name] = bench_render(sizes, [float(d) for d in args.dpr.split(",")], args.quick)
+        elif name == "recalc":
+            results[name] = bench_recalc(args.quick)
+        elif name == "startup":
+            results[name] = bench_startup(2 if args.quick else args.startup_runs)
+
+    report = {"meta": _meta(), "results": results}
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2); print()
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            for line in compare(report, json.load(f)):
+                print(line, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
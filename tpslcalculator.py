@@ -1,196 +1,715 @@
 # Cless TP/SL Desktop — Qt5 Modern UI + Profit Bar Overlay (v4.2)
 # ----------------------------------------------------------------
-# Install deps:  pip install PyQt5
+# Install deps:  pip install PyQt5 numpy
 # Run:          python cless_tp_sl_qt.py
+# Headless:     python tpslcalculator.py --batch setups.csv -o plan.csv
+# Profiling:    python tpslcalculator.py --profile   (or TPSL_PROFILE=1)
+# Startup:      python tpslcalculator.py --startup-time   (prints timings, exits)
+# Local API:    python tpslcalculator.py --serve 8765     (see tpslserver.py)
+# Journal:      python tpslcalculator.py --journal trades.sqlite   (see tpsljournal.py)
 # ----------------------------------------------------------------
 
+import time
+STARTED = time.perf_counter()   # startup is timed from here to the first event-loop turn
+
+import json
 import math
 import sys
-from PyQt5.QtCore import Qt, QSettings, QRectF, QTimer, QLineF, QPointF
-from PyQt5.QtGui import QFont, QPalette, QColor, QPainter, QPen,QIcon, QBrush, QLinearGradient
+from PyQt5.QtCore import Qt, QSettings, QRect, QRectF, QTimer, QLineF, QPointF, QEvent, QObject, pyqtSignal
+from PyQt5.QtGui import QFont, QPalette, QColor, QPainter, QPen,QIcon, QBrush, QLinearGradient, QPixmap, QKeySequence, QImage
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QGridLayout, QDoubleSpinBox, QSpinBox,
     QComboBox, QSlider, QPushButton, QHBoxLayout, QVBoxLayout, QFrame,
-    QCheckBox, QGroupBox
+    QCheckBox, QGroupBox, QLineEdit, QToolTip, QTableWidget, QTableWidgetItem, QHeaderView, QShortcut
 )
 
+import tpslcore as core
+import tpslprof as prof
+# tpslfeed / tpslsim / tpsljournal (NumPy, sqlite3 behind them) are imported on first use
+
+# before any @prof.timed below: a disabled decorator returns the plain function
+if "--profile" in sys.argv[1:]:
+    prof.enable()
+
 APP_ORG = "Cless"
 APP_NAME = "TPSLCalculator"
 
 DEFAULTS = {
-    "entry": 115.0,
-    "current": 119.72,
-    "shares": 100,
-    "tick": 0.01,
-    "side": "Long",    # Long/Short
-    "stop_pct": -4.0,
-    "target_pct": 8.0,
-    "flat_fee": 0.0,
-    "per_share_fee": 0.0,
+    **core.DEFAULTS,
+    "symbol": "",      # matched against feed ticks
     "always_on_top": True,
+    "alert_beep": True,
+    "trail_mode": "Off",
+    "trail_amount": 3.0,   # % / ticks / ATR multiple, per trail mode
+    "tag": "",         # setup tag for the trade journal
+    "account": 1_000_000.0,
+    "risk": 1.0,       # per trade, in risk_unit
+    "risk_unit": "%",  # % of account / ¥
 }
 
 # ---------------- Profit Bar Overlay ----------------
 class ProfitBar(QWidget):
     """Vertical gradient bar from Stop → Entry → Target, with live current price marker.
-       Works for Long and Short. Values are passed each repaint from the main panel.
+       Works for Long and Short. Values are pushed by the main panel when they change;
+       pushing the same values again does not repaint. With a RenderClock, a change
+       only marks the bar dirty and the clock repaints it on its next frame.
     """
-    def __init__(self, parent=None):
+    skipped_total = 0   # identical setValues calls avoided, all bars
+
+    def __init__(self, parent=None, clock=None):
         super().__init__(parent)
+        self.clock = clock
         self.setMinimumSize(64, 240)
         self.entry = 0
         self.stop = 0
         self.target = 0
         self.current = 0
         self.is_long = True
+        self.repaints_requested = 0
+        self.repaints_skipped = 0
+        self._layers = None   # (static key, back pixmap, front pixmap)
+        self._flash = None    # level kind being flashed after a cross alert
         self.setWindowTitle("Profit Bar")
 
     def setValues(self, entry, stop, target, current, is_long):
+        if (entry, stop, target, current, is_long) == (self.entry, self.stop, self.target, self.current, self.is_long):
+            self.repaints_skipped += 1
+            ProfitBar.skipped_total += 1
+            return
+        self.repaints_requested += 1
         self.entry = entry
         self.stop = stop
         self.target = target
         self.current = current
         self.is_long = is_long
-        self.update()
+        self._dirty()
 
-    def paintEvent(self, e):
-        p = QPainter(self)
+    def _dirty(self):
+        if self.clock is not None:
+            self.clock.mark(self)
+        else:
+            self.update()
+
+    FLASH_MS = 600
+
+    def flash(self, kind):
+        """Outline the bar in the colour of the level just crossed ("stop", "target", "breakeven")."""
+        self._flash = kind
+        self._dirty()
+        QTimer.singleShot(self.FLASH_MS, self._end_flash)
+
+    def _end_flash(self):
+        self._flash = None
+        self._dirty()
+
+    def event(self, e):
+        if e.type() == QEvent.ToolTip:
+            QToolTip.showText(e.globalPos(), f"Repaints: {self.repaints_requested} | avoided: {self.repaints_skipped}", self)
+            return True
+        return super().event(e)
+
+    # ---------- painting ----------
+    # Two cached layers (static in entry/stop/target/size/DPR) sandwich the
+    # per-tick overlay: back = card + SL/TP bands, front = grid + labels.
+    # A price tick only repaints the entry↔current band, marker and R label.
+    def _static_key(self):
+        return (self.entry, self.stop, self.target, self.is_long,
+                self.width(), self.height(), self.devicePixelRatioF())
+
+    def _geometry(self):
+        """Card rect, bar rect and the price → y mapping for the current values."""
+        rect = self.rect().adjusted(10, 10, -10, -10)
+        bar = rect.adjusted(18, 12, -18, -12)
+        lo = min(self.stop, self.target)
+        hi = max(self.stop, self.target)
+        rng = (hi - lo) if hi != lo else 1.0
+        top, height = bar.top(), bar.height()
+        return rect, bar, lambda price: top + (1.0 - (price - lo) / rng) * height
+
+    def _new_layer(self):
+        dpr = self.devicePixelRatioF()
+        pm = QPixmap(max(1, round(self.width() * dpr)), max(1, round(self.height() * dpr)))
+        pm.setDevicePixelRatio(dpr)
+        pm.fill(Qt.transparent)
+        return pm
+
+    def _build_layers(self):
+        res = paint_resources()
+        rect, bar, y_for = self._geometry()
+        back, front = self._new_layer(), self._new_layer()
+
+        p = QPainter(back)
         p.setRenderHint(QPainter.Antialiasing)
-
         # Background card
-        rect = self.rect().adjusted(10, 10, -10, -10)
         p.setPen(Qt.NoPen)
-        p.setBrush(QColor(40, 40, 40))
+        p.setBrush(res["card"])
         p.drawRoundedRect(rect, 10, 10)
+        if self.entry != 0:
+            # Inner card keeps the rounded look, then Red Stop ↔ Entry, Green Entry ↔ Target
+            p.drawRoundedRect(bar, 8, 8)
+            y_stop, y_entry, y_target = y_for(self.stop), y_for(self.entry), y_for(self.target)
+            for y1, y2, brush in ((y_stop, y_entry, res["sl_zone"]), (y_entry, y_target, res["tp_zone"])):
+                h = abs(y2 - y1)
+                if h > 0:
+                    p.setBrush(brush)
+                    p.drawRect(QRectF(bar.left(), min(y1, y2), bar.width(), h))
+        p.end()
+
+        if self.entry != 0:
+            p = QPainter(front)
+            p.setRenderHint(QPainter.Antialiasing)
+            # Thin divider at entry (yellow), then subtle grid lines for stop/entry/target
+            p.setPen(res["entry_line"])
+            p.drawLine(QLineF(bar.left(), y_entry, bar.right(), y_entry))
+            p.setPen(res["grid"])
+            for y in (y_stop, y_entry, y_target):
+                p.drawLine(QLineF(bar.left(), y, bar.right(), y))
+            # Labels (set per line color)
+            p.setFont(res["label_font"])
+            p.setPen(res["sl_text"]); p.drawText(bar.left()+4, int(y_stop)-2, f"SL {self.stop:.4g}")
+            p.setPen(res["en_text"]); p.drawText(bar.left()+4, int(y_entry)-2, f"EN {self.entry:.4g}")
+            p.setPen(res["tp_text"]); p.drawText(bar.left()+4, int(y_target)-2, f"TP {self.target:.4g}")
+            p.end()
+
+        self._layers = (self._static_key(), back, front)
+
+    @prof.timed()
+    def paintEvent(self, e):
+        if self._layers is None or self._layers[0] != self._static_key():
+            self._build_layers()
+        _, back, front = self._layers
 
+        p = QPainter(self)
+        p.drawPixmap(0, 0, back)
         if self.entry == 0:
             return
 
-        # Determine min/max for scale based on stop/target
-        lo = min(self.stop, self.target)
-        hi = max(self.stop, self.target)
-        rng = (hi - lo) if hi != lo else 1.0
-
-        # Bar area inside card
-        bar = rect.adjusted(18, 12, -18, -12)
-
-        # === Constant color zones ===
-        def y_for(price):
-            return bar.top() + (1.0 - (price - lo) / rng) * bar.height()
-
-        y_stop   = y_for(self.stop)
-        y_entry  = y_for(self.entry)
-        y_target = y_for(self.target)
-
-        # Helper to draw a vertical band between two y's in a solid color
-        def draw_band(y1, y2, color_hex):
-            top = min(y1, y2)
-            h   = abs(y2 - y1)
-            if h <= 0:
-                return
-            p.setPen(Qt.NoPen)
-            p.setBrush(QColor(color_hex))
-            p.drawRect(QRectF(bar.left(), top, bar.width(), h))
-
-        # Fill the card background inside the bar area first (keeps rounded card look)
-        p.setPen(Qt.NoPen)
-        p.setBrush(QColor(40, 40, 40))
-        p.drawRoundedRect(bar, 8, 8)
+        res = paint_resources()
+        _, bar, y_for = self._geometry()
+        p.setRenderHint(QPainter.Antialiasing)
 
-        # Red band between Stop ↔ Entry, Green band between Entry ↔ Target
-        draw_band(y_stop, y_entry, "#FF5555")  # SL zone (red)
-        draw_band(y_entry, y_target, "#B7FF5E")  # TP zone (green)
-        
         # --- Dynamic band between ENTRY and CURRENT ---
-        y_entry   = y_for(self.entry)
-        y_current = y_for(self.current)
-
-        # only draw if current ≠ entry
-        if abs(y_entry - y_current) > 1:
-            top = min(y_entry, y_current)
-            h   = abs(y_entry - y_current)
-            
-            # choose color based on position
+        y_entry = y_for(self.entry)
+        ycur = y_for(self.current)
+        if abs(y_entry - ycur) > 1:
             if self.current > self.entry:
-                color = QColor("#50FA7B")   # light green (profit zone)
-            elif self.current < self.entry and self.current > self.stop:
-                color = QColor("#FFEF60")   # yellow (between SL and entry)
+                brush = res["band_profit"]     # light green (profit zone)
+            elif self.current > self.stop:
+                brush = res["band_neutral"]    # yellow (between SL and entry)
             else:
-                color = QColor("#FF5555")   # optional: red if below stop
-
+                brush = res["band_loss"]       # red if below stop
             p.setPen(Qt.NoPen)
-            p.setBrush(color)
-            p.drawRect(QRectF(bar.left(), top, bar.width(), h))
-
-
-        # Optional: thin divider line at entry (yellow)
-        p.setPen(QPen(QColor("#F1FA8C"), 2))
-        p.drawLine(QLineF(bar.left(), y_entry, bar.right(), y_entry))
-
-
-        # Draw lines for stop/entry/target (subtle grid if you want it)
-        pen_grid = QPen(QColor(90,90,90)); pen_grid.setWidthF(1.0)
-        p.setPen(pen_grid)
-        for pr in (self.stop, self.entry, self.target):
-            y = y_for(pr)
-            p.drawLine(QLineF(bar.left(), y, bar.right(), y))
-
-        # Labels (set per line color)
-        font = p.font(); font.setPointSize(9); font.setBold(True); p.setFont(font)
-
-        # SL label (red)
-        p.setPen(QColor("#E5FF55"))
-        p.drawText(bar.left()+4, int(y_stop)-2, f"SL {self.stop:.4g}")
+            p.setBrush(brush)
+            p.drawRect(QRectF(bar.left(), min(y_entry, ycur), bar.width(), abs(y_entry - ycur)))
 
-        # EN label (yellow)
-        p.setPen(QColor("#202020"))
-        p.drawText(bar.left()+4, int(y_entry)-2, f"EN {self.entry:.4g}")
-
-        # TP label (green)
-        p.setPen(QColor("#FF7AD3"))
-        p.drawText(bar.left()+4, int(y_target)-2, f"TP {self.target:.4g}")
-
-
-        # Labels
-        p.setPen(QColor("#FF7AD3"))  # Dracula foreground
-        font = p.font(); font.setPointSize(9);font.setBold(True); p.setFont(font); 
-        def draw_label(text, y):
-            p.drawText(bar.left()+4, int(y)-2, text)
-            draw_label(f"SL {self.stop:.4g}", y_for(self.stop))
-            draw_label(f"EN {self.entry:.4g}", y_for(self.entry))
-            draw_label(f"TP {self.target:.4g}", y_for(self.target))
+        p.drawPixmap(0, 0, front)
 
         # Current price marker
-        ycur = y_for(self.current)
-        pen_cur = QPen(QColor(140, 200, 255)); pen_cur.setWidth(2)
-        p.setPen(pen_cur)
+        p.setFont(res["label_font"])
+        p.setPen(res["current_line"])
         p.drawLine(QLineF(bar.left()-4, ycur, bar.right()+4, ycur))
-        p.setPen(QColor("#3A3A3A"))  # Dracula purple accent
+        p.setPen(res["current_text"])
         p.drawText(bar.right()-42, int(ycur)-4, f"{self.current:.4g}")
 
-        # R multiple indicator at right side (optional): position current relative to entry per-risk
+        # R multiple indicator: current relative to entry, per unit of risk
         per_risk = abs(self.entry - self.stop)
         if per_risk > 0:
             r_mult = ((self.current - self.entry) if self.is_long else (self.entry - self.current)) / per_risk
-            p.setPen(QColor(180, 220, 255))
+            p.setPen(res["r_text"])
             p.drawText(bar.left(), bar.bottom()+16, f"R = {r_mult:.2f}")
+
+        if self._flash:
+            p.setPen(res["flash_" + self._flash])
+            p.setBrush(Qt.NoBrush)
+            p.drawRect(QRectF(self.rect()).adjusted(2, 2, -2, -2))
         p.end()
 
 
+_PAINT = None
+
+def paint_resources():
+    """Pens, brushes and the label font for ProfitBar, built once and shared by every bar."""
+    global _PAINT
+    if _PAINT is None:
+        font = QFont(QApplication.font()); font.setPointSize(9); font.setBold(True)
+        grid = QPen(QColor(90, 90, 90)); grid.setWidthF(1.0)
+        cur = QPen(QColor(140, 200, 255)); cur.setWidth(2)
+        _PAINT = {
+            "card": QBrush(QColor(40, 40, 40)),
+            "sl_zone": QBrush(QColor("#FF5555")),
+            "tp_zone": QBrush(QColor("#B7FF5E")),
+            "band_profit": QBrush(QColor("#50FA7B")),
+            "band_neutral": QBrush(QColor("#FFEF60")),
+            "band_loss": QBrush(QColor("#FF5555")),
+            "entry_line": QPen(QColor("#F1FA8C"), 2),
+            "grid": grid,
+            "current_line": cur,
+            "sl_text": QPen(QColor("#E5FF55")),
+            "en_text": QPen(QColor("#202020")),
+            "tp_text": QPen(QColor("#FF7AD3")),
+            "current_text": QPen(QColor("#3A3A3A")),
+            "r_text": QPen(QColor(180, 220, 255)),
+            "flash_stop": QPen(QColor("#FF5555"), 4),
+            "flash_target": QPen(QColor("#50FA7B"), 4),
+            "flash_breakeven": QPen(QColor("#F1FA8C"), 4),
+            "label_font": font,
+        }
+    return _PAINT
+
+
+class RenderClock(QObject):
+    """One frame timer shared by every overlay bar.
+
+    setValues on a clocked bar only marks it dirty; each frame repaints the
+    bars that changed since the last one, at most once per display refresh.
+    The timer runs only while something is dirty, so idle overlays cost nothing.
+    """
+    def __init__(self):
+        super().__init__()
+        screen = QApplication.primaryScreen()
+        hz = screen.refreshRate() if screen is not None else 0
+        self.interval_ms = max(1, round(1000 / (hz if hz >= 1 else 60)))
+        self._dirty = {}       # bar → None, an insertion-ordered set
+        self._last = 0.0       # perf_counter of the last frame
+        self.frames = 0
+        self.repaints = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._frame)
+
+    def mark(self, bar):
+        self._dirty[bar] = None
+        if not self._timer.isActive():
+            # first change after idle: wait only for what is left of the current frame
+            since = (time.perf_counter() - self._last) * 1000
+            self._timer.start(max(0, int(self.interval_ms - since)))
+
+    def forget(self, bar):
+        self._dirty.pop(bar, None)
+
+    def _frame(self):
+        self._last = time.perf_counter()
+        dirty, self._dirty = self._dirty, {}
+        self.frames += 1
+        self.repaints += len(dirty)
+        for bar in dirty:
+            bar.update()
+
+
+_CLOCK = None
+
+def render_clock():
+    """The RenderClock every overlay shares, built on first use."""
+    global _CLOCK
+    if _CLOCK is None:
+        _CLOCK = RenderClock()
+    return _CLOCK
+
+
 class OverlayWindow(QWidget):
     """A tiny floating window that shows only the ProfitBar."""
-    def __init__(self):
+    def __init__(self, title="Profit Overlay", clock=None):
         super().__init__()
-        self.setWindowTitle("Profit Overlay")
+        self.setWindowTitle(title)
         self.setWindowFlags(self.windowFlags() | Qt.Tool | Qt.WindowStaysOnTopHint)
         self.setAttribute(Qt.WA_TranslucentBackground, False)
-        self.bar = ProfitBar()
+        self.bar = ProfitBar(clock=clock)
         lay = QVBoxLayout(self); lay.setContentsMargins(6,6,6,6); lay.addWidget(self.bar)
         self.resize(120, 320)
 
     def update_values(self, entry, stop, target, current, is_long):
         self.bar.setValues(entry, stop, target, current, is_long)
 
+
+class OverlayManager:
+    """One OverlayWindow per key (a portfolio position), all on the shared
+    RenderClock and paint_resources(). New windows are tiled across the screen."""
+    STEP = (128, 328)   # tile pitch, a little over OverlayWindow's size
+
+    def __init__(self):
+        self.windows = {}   # key → OverlayWindow
+        self._placed = 0
+
+    def __contains__(self, key):
+        return key in self.windows
+
+    def __len__(self):
+        return len(self.windows)
+
+    def open(self, key, title, values):
+        w = self.windows.get(key)
+        if w is None:
+            w = self.windows[key] = OverlayWindow(title, clock=render_clock())
+            self._tile(w)
+        w.update_values(*values)
+        w.show()
+        return w
+
+    def update(self, key, values):
+        w = self.windows.get(key)
+        if w is not None:
+            w.update_values(*values)
+
+    def close(self, key):
+        w = self.windows.pop(key, None)
+        if w is None: return
+        render_clock().forget(w.bar)
+        w.close()
+        w.deleteLater()
+
+    def close_all(self):
+        for key in list(self.windows):
+            self.close(key)
+
+    def _tile(self, w):
+        screen = QApplication.primaryScreen()
+        area = screen.availableGeometry() if screen is not None else QRect(0, 0, 1280, 800)
+        cols = max(1, area.width() // self.STEP[0])
+        rows = max(1, area.height() // self.STEP[1])
+        i = self._placed % (cols * rows)
+        self._placed += 1
+        w.move(area.right() - (i % cols + 1) * self.STEP[0], area.top() + (i // cols) * self.STEP[1])
+
+# ---------------- Stop × Target Grid ----------------
+class HeatmapWindow(QWidget):
+    """R for every stop % × target % on the sliders' grid (core.sweep_grid).
+
+    Rows are stop % (lowest at the top), columns target %; the sliders' cell
+    is outlined. Hover for R / RR / risk / shares, click to move the sliders.
+    """
+    picked = pyqtSignal(int, int)   # stop, target in basis points
+    R_MAX = 5.0                     # full green from this R up
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Stop × Target")
+        self.setMouseTracking(True)
+        self.setMinimumSize(240, 180)
+        self.resize(520, 380)
+        self.grid = None
+        self._image = None
+        self._pixels = None   # the QImage's buffer; QImage does not copy it
+        self._cell_at = None  # (row, col) outlined
+
+    def set_grid(self, grid, stop_pct, tgt_pct):
+        """Show grid (a sweep_grid result); the image is rebuilt only when it's a different grid."""
+        if grid is not self.grid:
+            self.grid = grid
+            self._image = self._build_image(grid["R"])
+        i = min(range(len(grid["stop_pct"])), key=lambda k: abs(grid["stop_pct"][k] - stop_pct))
+        j = min(range(len(grid["target_pct"])), key=lambda k: abs(grid["target_pct"][k] - tgt_pct))
+        self._cell_at = (i, j)
+        self.update()
+
+    def _build_image(self, R):
+        import numpy as np
+        t = np.clip(R / self.R_MAX, 0.0, 1.0)[..., None]
+        low, high, bad = np.array([40, 42, 54]), np.array([80, 250, 123]), np.array([140, 47, 47])
+        rgb = np.where(R[..., None] > 0, low + (high - low) * t, bad).astype(np.uint32)
+        self._pixels = np.ascontiguousarray(0xFF000000 | rgb[..., 0] << 16 | rgb[..., 1] << 8 | rgb[..., 2])
+        h, w = R.shape
+        return QImage(self._pixels.data, w, h, 4 * w, QImage.Format_RGB32)
+
+    def _cell(self, pos):
+        rows, cols = self.grid["R"].shape
+        i = min(rows - 1, max(0, pos.y() * rows // max(1, self.height())))
+        j = min(cols - 1, max(0, pos.x() * cols // max(1, self.width())))
+        return i, j
+
+    def paintEvent(self, e):
+        p = QPainter(self)
+        if self._image is None:
+            return
+        p.drawImage(self.rect(), self._image)
+        if self._cell_at is not None:
+            rows, cols = self.grid["R"].shape
+            i, j = self._cell_at
+            w, h = self.width() / cols, self.height() / rows
+            p.setPen(QPen(QColor("#F8F8F2"), 1))
+            p.setBrush(Qt.NoBrush)
+            p.drawRect(QRectF(j * w - 2, i * h - 2, w + 4, h + 4))
+
+    def mouseMoveEvent(self, e):
+        if self.grid is None: return
+        g = self.grid
+        i, j = self._cell(e.pos())
+        QToolTip.showText(e.globalPos(),
+            f"Stop {g['stop_pct'][i] * 100:.2f}% → {g['stop'][i]:.6g} | Target {g['target_pct'][j] * 100:.2f}% → {g['target'][j]:.6g}\n"
+            f"R {g['R'][i, j]:.2f} | RR {g['RR'][i, j]:.2f} | Risk ¥{g['risk'][i, j]:.0f} | Shares {g['shares'][i]}", self)
+
+    def mousePressEvent(self, e):
+        if self.grid is None or e.button() != Qt.LeftButton: return
+        i, j = self._cell(e.pos())
+        self.picked.emit(round(self.grid["stop_pct"][i] * 10000), round(self.grid["target_pct"][j] * 10000))
+
+
+# ---------------- Portfolio ----------------
+class PortfolioWindow(QWidget):
+    """Table of open positions with portfolio totals.
+
+    Backed by core.Portfolio: editing a row replans that position and
+    refreshes only its own cells plus the totals line.
+    """
+    # (header, position key, scale from cell text to the stored value)
+    INPUT_COLS = [
+        ("Symbol", "symbol", None), ("Side", "long", None), ("Entry", "entry", 1.0),
+        ("Current", "current", 1.0), ("Shares", "shares", 1.0), ("Tick", "tick", 1.0),
+        ("Stop %", "stop_pct", 0.01), ("Target %", "tgt_pct", 0.01),
+    ]
+    OUTPUT_COLS = [
+        ("Stop", "stop", "{:.6g}"), ("Target", "target", "{:.6g}"), ("Risk", "risk", "{:.0f}"),
+        ("Reward", "reward", "{:.0f}"), ("R", "R", "{:.2f}"), ("P/L", "unreal_net", "{:.0f}"),
+    ]
+
+    def __init__(self, account=0.0):
+        super().__init__()
+        self.setWindowTitle("Portfolio")
+        self.portfolio = core.Portfolio(account)
+        self._row_of = {}   # pid → table row
+
+        self.table = QTableWidget(0, len(self.INPUT_COLS) + len(self.OUTPUT_COLS))
+        self.table.setHorizontalHeaderLabels([c[0] for c in self.INPUT_COLS + self.OUTPUT_COLS])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.verticalHeader().setVisible(False)
+        self.table.itemChanged.connect(self._on_item_changed)
+
+        self.spn_account = QDoubleSpinBox(); self.spn_account.setRange(0, 1e12); self.spn_account.setDecimals(0)
+        self.spn_account.setValue(account); self.spn_account.valueChanged.connect(self._on_account)
+        self.overlays = OverlayManager()
+        self.btn_overlays = QPushButton("Overlays")
+        self.btn_overlays.setToolTip("Toggle a floating profit bar for each selected position (all if none selected)")
+        self.btn_overlays.clicked.connect(self.toggle_overlays)
+        self.btn_remove = QPushButton("Remove")
+        self.btn_remove.clicked.connect(self.remove_selected)
+        self.lbl_totals = QLabel()
+
+        top = QHBoxLayout()
+        top.addWidget(QLabel("Account ¥")); top.addWidget(self.spn_account)
+        top.addStretch(1); top.addWidget(self.btn_overlays); top.addWidget(self.btn_remove)
+        lay = QVBoxLayout(self)
+        lay.addLayout(top); lay.addWidget(self.table); lay.addWidget(self.lbl_totals)
+        self.resize(900, 360)
+        self.refresh_totals()
+
+    # ---------- positions ----------
+    def add_position(self, symbol="", **inputs):
+        pid = self.portfolio.add(symbol, **inputs)
+        row = self.table.rowCount()
+        self.table.blockSignals(True)
+        self.table.insertRow(row)
+        pos = self.portfolio.positions[pid]
+        for col, (_, key, _) in enumerate(self.INPUT_COLS):
+            item = QTableWidgetItem(self._input_text(key, pos[key]))
+            item.setData(Qt.UserRole, pid)
+            self.table.setItem(row, col, item)
+        for col in range(len(self.INPUT_COLS), self.table.columnCount()):
+            item = QTableWidgetItem(); item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+            self.table.setItem(row, col, item)
+        self.table.blockSignals(False)
+        self._row_of[pid] = row
+        self.refresh_row(pid)
+        self.refresh_totals()
+        return pid
+
+    def update_position(self, pid, **changes):
+        self.portfolio.update(pid, **changes)
+        self.table.blockSignals(True)
+        row = self._row_of[pid]
+        pos = self.portfolio.positions[pid]
+        for col, (_, key, _) in enumerate(self.INPUT_COLS):
+            if key in changes:
+                self.table.item(row, col).setText(self._input_text(key, pos[key]))
+        self.table.blockSignals(False)
+        self.refresh_row(pid)
+        self.refresh_totals()
+
+    def set_price(self, symbol, price):
+        for pid in list(self.portfolio.by_symbol.get(symbol, ())):
+            self.update_position(pid, current=price)
+
+    def _selected_pids(self):
+        return [self.table.item(r, 0).data(Qt.UserRole) for r in sorted({i.row() for i in self.table.selectedItems()})]
+
+    def remove_selected(self):
+        for pid in self._selected_pids():
+            self.remove_position(pid)
+
+    def remove_position(self, pid):
+        self.overlays.close(pid)
+        self.portfolio.remove(pid)
+        self.table.removeRow(self._row_of[pid])
+        self._row_of = {self.table.item(r, 0).data(Qt.UserRole): r for r in range(self.table.rowCount())}
+        self.refresh_totals()
+
+    # ---------- overlays ----------
+    def bar_values(self, pid):
+        pos, res = self.portfolio.positions[pid], self.portfolio.rows[pid]
+        return pos["entry"], res["stop"], res["target"], pos["current"], pos["long"]
+
+    def toggle_overlays(self):
+        """Open overlays for the selected positions (all if none), or close them if all are open."""
+        pids = self._selected_pids() or list(self.portfolio.positions)
+        if pids and all(pid in self.overlays for pid in pids):
+            for pid in pids: self.overlays.close(pid)
+            return
+        for pid in pids:
+            sym = self.portfolio.positions[pid]["symbol"]
+            self.overlays.open(pid, sym or f"#{pid}", self.bar_values(pid))
+
+    # ---------- display ----------
+    def _input_text(self, key, value):
+        if key == "long": return "Long" if value else "Short"
+        if key == "symbol": return value
+        if key in ("stop_pct", "tgt_pct"): return f"{value * 100:.2f}"
+        return f"{value:g}"
+
+    def refresh_row(self, pid):
+        row, res = self._row_of[pid], self.portfolio.rows[pid]
+        self.table.blockSignals(True)
+        for j, (_, key, fmt) in enumerate(self.OUTPUT_COLS):
+            self.table.item(row, len(self.INPUT_COLS) + j).setText(fmt.format(res[key]))
+        self.table.blockSignals(False)
+        self.overlays.update(pid, self.bar_values(pid))
+
+    def refresh_totals(self):
+        t = self.portfolio.totals
+        self.lbl_totals.setText(
+            f"{len(self.portfolio)} positions | Risk ¥ {t['risk']:.0f} ({self.portfolio.risk_share():.2f}% of account)"
+            f" | Reward ¥ {t['reward']:.0f} | Net P/L ¥ {t['unreal_net']:.0f}")
+
+    # ---------- edits ----------
+    def _on_account(self, value):
+        self.portfolio.account = value
+        self.refresh_totals()
+
+    def _on_item_changed(self, item):
+        if item.column() >= len(self.INPUT_COLS): return
+        pid = item.data(Qt.UserRole)
+        _, key, scale = self.INPUT_COLS[item.column()]
+        text = item.text().strip()
+        old = self.portfolio.positions[pid][key]
+        try:
+            if key == "symbol": value = text
+            elif key == "long": value = text.lower().startswith("l")
+            else:
+                value = float(text) * scale
+                if not math.isfinite(value): raise ValueError(text)
+                if key == "shares": value = int(value)
+            self.update_position(pid, **{key: value})
+        except (ValueError, OverflowError):
+            self.update_position(pid, **{key: old})   # bad input → put the old value back
+
+
+class PortfolioBook:
+    """core.Portfolio's interface over a PortfolioWindow, so positions pushed
+    through tpslserver show up (and replan) in the table like typed ones."""
+    def __init__(self, window):
+        self.window = window
+
+    positions = property(lambda self: self.window.portfolio.positions)
+    rows = property(lambda self: self.window.portfolio.rows)
+    totals = property(lambda self: self.window.portfolio.totals)
+    levels = property(lambda self: self.window.portfolio.levels)
+
+    def add(self, symbol="", **inputs):
+        return self.window.add_position(symbol, **inputs)
+
+    def update(self, pid, **changes):
+        self.window.update_position(pid, **changes)
+        return self.rows[pid]
+
+    def remove(self, pid):
+        self.window.remove_position(pid)
+
+    def set_price(self, symbol, price):
+        pids = list(self.window.portfolio.by_symbol.get(symbol, ()))
+        self.window.set_price(symbol, price)
+        return pids
+
+
+class GuiInvoker(QObject):
+    """submit(fn, *args) from any thread → concurrent Future; fn runs on the GUI thread."""
+    _call = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self._call.connect(self._run)   # queued when emitted off the GUI thread
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        fut = Future()
+        self._call.emit((fut, fn, args))
+        return fut
+
+    def _run(self, job):
+        fut, fn, args = job
+        try:
+            fut.set_result(fn(*args))
+        except Exception as e:
+            fut.set_exception(e)
+
+
+def dump_profile():
+    """prof.dump() → a one-line result for the UI; a write failure is reported, not raised."""
+    try:
+        return f"Wrote {prof.dump()}"
+    except OSError as e:
+        return f"Dump failed: {e}"
+
+
+class DiagnosticsWindow(QWidget):
+    """Live tpslprof stats: count and p50 / p99 / max per timed call, plus event-loop lag."""
+    COLS = [("Name", None), ("Calls", "count"), ("p50 ms", "p50_ms"), ("p99 ms", "p99_ms"), ("Max ms", "max_ms")]
+    REFRESH_MS = 500
+
+    def __init__(self, extra=None):
+        super().__init__()
+        self.setWindowTitle("Diagnostics")
+        self.extra = extra   # callable → {label: value} appended below the table
+
+        self.table = QTableWidget(0, len(self.COLS))
+        self.table.setHorizontalHeaderLabels([c[0] for c in self.COLS])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.lbl_info = QLabel()
+        self.btn_dump = QPushButton("Dump JSON")
+        self.btn_dump.clicked.connect(self.dump)
+
+        bottom = QHBoxLayout()
+        bottom.addWidget(self.lbl_info, 1); bottom.addWidget(self.btn_dump)
+        lay = QVBoxLayout(self)
+        lay.addWidget(self.table); lay.addLayout(bottom)
+        self.resize(520, 300)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.REFRESH_MS)
+        self._timer.timeout.connect(self.refresh)
+
+    def showEvent(self, e):
+        self.refresh()
+        self._timer.start()
+        super().showEvent(e)
+
+    def hideEvent(self, e):
+        self._timer.stop()
+        super().hideEvent(e)
+
+    def refresh(self):
+        rows = prof.stats()
+        self.table.setRowCount(len(rows))
+        for r, (name, st) in enumerate(rows.items()):
+            for c, (_, key) in enumerate(self.COLS):
+                text = name if key is None else (str(st[key]) if key == "count" else f"{st[key]:.3f}")
+                self.table.setItem(r, c, QTableWidgetItem(text))
+        info = {} if prof.enabled else {"Profiling": "off (run with --profile or TPSL_PROFILE=1)"}
+        if self.extra: info.update(self.extra())
+        self.lbl_info.setText(" | ".join(f"{k}: {v}" for k, v in info.items()))
+
+    def dump(self):
+        self.lbl_info.setText(dump_profile())
+
+
 # ---------------- Main Panel ----------------
 class TPSLWidget(QWidget):
     def __init__(self):
@@ -203,18 +722,40 @@ class TPSLWidget(QWidget):
         self.state = DEFAULTS.copy()
         self.load_settings()
 
-        self.overlay = OverlayWindow()  # created up front; hidden until toggled
-        self.overlay.hide()
+        self.overlay = None    # OverlayWindow, built on first toggle
+        self.portfolio = None  # PortfolioWindow, built on first use
+        self.feed = None       # tpslfeed.Feed, see attach_feed()
+        self._feed_timer = None
+        self._bar_values = None        # (entry, stop, target, current, long) from the last recalc
+        self._sim_pool = None          # one background thread for Monte Carlo runs
+        self._sim_procs = None         # its worker processes, kept for the widget's lifetime
+        self._sim_future = None
+        self._sim_key = None           # setup the MC result shown belongs to
+        self._sim_pending_key = None
+        self._overlay_queued = False
+        self.diagnostics = None        # DiagnosticsWindow, Ctrl+Shift+D
+        self.levels = core.LevelIndex()  # this setup's stop/target/breakeven, under pid "main"
+        self._breakeven = 0.0
+        self.alert_sink = None         # tpslfeed.AlertSink, see --alerts
+        self.alerts_fired = 0
+        self._last_alert = ""
+        self._trail = None             # core.TrailingStop while a trail mode is on
+        self._trail_key = None
+        self._trail_px = None          # last price fed to it
+        self.server = None             # tpslserver.Server, see serve()
+        self.journal = None            # tpsljournal.Journal: after startup if the file exists, else on Log trade
+        self.journal_path = None       # None: tpsljournal.DEFAULT_PATH (--journal)
+        self._open_trade = None        # id of the logged trade "Close" will close
+        self.heatmap = None            # HeatmapWindow, built on first toggle
+        self._lag_timer = prof.start_lag_monitor(self) if prof.enabled else None
+        self._recalc_queued = False
+        self.recalc_requested = 0      # request_recalc() calls
+        self.recalc_executed = 0       # recalc() passes actually run
 
         self.build_ui()
         self.apply_always_on_top(self.state["always_on_top"])
         self.recalc()
-
-        # small timer to keep overlay responsive if user drags sliders fast
-        self._overlay_timer = QTimer(self)
-        self._overlay_timer.setInterval(80)
-        self._overlay_timer.timeout.connect(self.push_to_overlay)
-        self._overlay_timer.start()
+        QTimer.singleShot(self.JOURNAL_DELAY_MS, self._open_existing_journal)
 
     # ---------- UI ----------
     def build_ui(self):
@@ -231,16 +772,19 @@ class TPSLWidget(QWidget):
         self.chk_top = QCheckBox("On Top")
         self.chk_top.setChecked(self.state["always_on_top"])
         self.btn_overlay = QPushButton("Overlay")
+        self.btn_portfolio = QPushButton("Portfolio")
 
         self.btn_save.clicked.connect(self.save_settings)
         self.btn_reset.clicked.connect(self.reset_defaults)
         self.chk_top.stateChanged.connect(lambda _: self.apply_always_on_top(self.chk_top.isChecked()))
         self.btn_overlay.clicked.connect(self.toggle_overlay)
+        self.btn_portfolio.clicked.connect(self.toggle_portfolio)
 
         header = QHBoxLayout()
         header.addWidget(title)
         header.addStretch(1)
         header.addWidget(self.btn_overlay)
+        header.addWidget(self.btn_portfolio)
         header.addWidget(self.btn_save)
         header.addWidget(self.btn_reset)
         header.addWidget(self.chk_top)
@@ -270,6 +814,34 @@ class TPSLWidget(QWidget):
         fee_wrap = QWidget(); fee_wrap.setLayout(fee_box)
         inputs.addWidget(fee_wrap, r, 3)
 
+        r += 1
+        inputs.addWidget(QLabel("Symbol"), r, 0)
+        self.edt_symbol = QLineEdit(self.state["symbol"]); self.edt_symbol.setPlaceholderText("for live feed") ; inputs.addWidget(self.edt_symbol, r, 1)
+        self.lbl_feed = QLabel("Feed: off") ; inputs.addWidget(self.lbl_feed, r, 2)
+        self.chk_beep = QCheckBox("Beep"); self.chk_beep.setChecked(self.state["alert_beep"])
+        self.chk_beep.setToolTip("Beep when a feed price crosses a stop, target or breakeven")
+        inputs.addWidget(self.chk_beep, r, 3)
+
+        r += 1
+        inputs.addWidget(QLabel("Tag"), r, 0)
+        self.edt_tag = QLineEdit(self.state["tag"]); self.edt_tag.setPlaceholderText("setup, for the journal") ; inputs.addWidget(self.edt_tag, r, 1)
+        journal_row = QHBoxLayout()
+        self.btn_log = QPushButton("Log trade"); self.btn_log.setToolTip("Record this setup in the trade journal")
+        self.btn_close_trade = QPushButton("Close @ current"); self.btn_close_trade.setEnabled(False)
+        self.btn_close_trade.setToolTip("Close the last logged trade at the current price")
+        journal_row.addWidget(self.btn_log); journal_row.addWidget(self.btn_close_trade)
+        inputs.addLayout(journal_row, r, 2, 1, 2)
+
+        r += 1
+        inputs.addWidget(QLabel("Account / risk"), r, 0)
+        self.spn_account = QDoubleSpinBox(); self.spn_account.setRange(0, 1e12); self.spn_account.setDecimals(0); self.spn_account.setPrefix("¥ "); self.spn_account.setValue(self.state["account"]) ; inputs.addWidget(self.spn_account, r, 1)
+        size_row = QHBoxLayout()
+        self.spn_risk = QDoubleSpinBox(); self.spn_risk.setRange(0, 1e9); self.spn_risk.setDecimals(2); self.spn_risk.setValue(self.state["risk"]) ; size_row.addWidget(self.spn_risk, 1)
+        self.cmb_risk_unit = QComboBox(); self.cmb_risk_unit.addItems(["%", "¥"]); self.cmb_risk_unit.setCurrentText(self.state["risk_unit"]) ; size_row.addWidget(self.cmb_risk_unit)
+        self.btn_size = QPushButton("Size"); self.btn_size.setToolTip("Shares that lose at most this much (fees included) at the stop")
+        size_row.addWidget(self.btn_size)
+        inputs.addLayout(size_row, r, 2, 1, 2)
+
         inputs_box = QGroupBox("Inputs")
         inputs_box.setLayout(inputs)
 
@@ -282,11 +854,25 @@ class TPSLWidget(QWidget):
         r += 1
         self.lbl_tgt_pct = QLabel("Target % (from entry):")
         self.sld_tgt = QSlider(Qt.Horizontal); self.sld_tgt.setRange(-5000, 10000); self.sld_tgt.setSingleStep(50); self.sld_tgt.setValue(int(self.state["target_pct"]*100))
+        # Lookup tables for drags, rebuilt lazily when entry/tick/side/shares change
+        self._stop_table = core.SliderTable(self.sld_stop.minimum(), self.sld_stop.maximum(), "stop")
+        self._tgt_table = core.SliderTable(self.sld_tgt.minimum(), self.sld_tgt.maximum(), "target")
         sliders.addWidget(self.lbl_tgt_pct, r, 0); sliders.addWidget(self.sld_tgt, r, 1)
+        r += 1
+        trail_row = QHBoxLayout()
+        self.cmb_trail = QComboBox(); self.cmb_trail.addItems([m for m, _ in self.TRAIL_MODES])
+        self.cmb_trail.setToolTip("Trail the stop from the best price since entry; it only tightens")
+        self.spn_trail = QDoubleSpinBox(); self.spn_trail.setRange(0.01, 1000); self.spn_trail.setDecimals(2)
+        self.spn_trail.setValue(self.state["trail_amount"])
+        trail_row.addWidget(self.cmb_trail); trail_row.addWidget(self.spn_trail, 1)
+        self.cmb_trail.setCurrentText(self.state["trail_mode"]); self._trail_suffix()
+        sliders.addWidget(QLabel("Trailing stop:"), r, 0); sliders.addLayout(trail_row, r, 1)
 
         quick = QHBoxLayout()
         self.btn_1r = QPushButton("TP = 1R"); self.btn_2r = QPushButton("TP = 2R"); self.btn_3r = QPushButton("TP = 3R")
-        quick.addWidget(self.btn_1r); quick.addWidget(self.btn_2r); quick.addWidget(self.btn_3r)
+        self.btn_add_pos = QPushButton("+ Portfolio")
+        self.btn_grid = QPushButton("Grid"); self.btn_grid.setToolTip("R for every stop % × target %; click a cell to use it")
+        quick.addWidget(self.btn_1r); quick.addWidget(self.btn_2r); quick.addWidget(self.btn_3r); quick.addWidget(self.btn_add_pos); quick.addWidget(self.btn_grid)
         sliders_box = QGroupBox("Targets & Stop")
         sliders_v = QVBoxLayout(); sliders_v.addLayout(sliders); sliders_v.addLayout(quick)
         sliders_box.setLayout(sliders_v)
@@ -301,6 +887,16 @@ class TPSLWidget(QWidget):
         self.out_rr = QLabel("Risk ¥ — | Reward ¥ — | R — | RR —"); outputs.addWidget(self.out_rr, r, 0)
         r += 1
         self.out_pl = QLabel("Unrealized P/L: — | Breakeven: —"); outputs.addWidget(self.out_pl, r, 0)
+        r += 1
+        sim_row = QHBoxLayout()
+        self.spn_vol = QDoubleSpinBox(); self.spn_vol.setRange(0.01, 500); self.spn_vol.setDecimals(2); self.spn_vol.setSuffix(" % vol")
+        self.spn_vol.setValue(2.0); self.spn_vol.setToolTip("Volatility over the simulated horizon (e.g. daily vol)")
+        self.btn_sim = QPushButton("Sim")
+        self.out_mc = QLabel("MC: —")
+        sim_row.addWidget(self.spn_vol); sim_row.addWidget(self.btn_sim); sim_row.addWidget(self.out_mc, 1)
+        outputs.addLayout(sim_row, r, 0, 1, 2)
+        r += 1
+        self.out_journal = QLabel("Journal: —"); outputs.addWidget(self.out_journal, r, 0, 1, 2)
         outputs_box = QGroupBox("Outputs")
         outputs_box.setLayout(outputs)
 
@@ -315,87 +911,317 @@ class TPSLWidget(QWidget):
         # Signals
         for w in [self.cmb_side, self.spn_tick, self.spn_entry, self.spn_curr, self.spn_shares, self.spn_flat, self.spn_ps]:
             if isinstance(w, QComboBox):
-                w.currentIndexChanged.connect(self.recalc)
+                w.currentIndexChanged.connect(self.request_recalc)
             else:
-                w.valueChanged.connect(self.recalc)
-        self.sld_stop.valueChanged.connect(self.recalc)
-        self.sld_tgt.valueChanged.connect(self.recalc)
+                w.valueChanged.connect(self.request_recalc)
+        self.sld_stop.valueChanged.connect(self.request_recalc)
+        self.sld_tgt.valueChanged.connect(self.request_recalc)
         self.btn_1r.clicked.connect(lambda: self.set_tp_R(1))
         self.btn_2r.clicked.connect(lambda: self.set_tp_R(2))
         self.btn_3r.clicked.connect(lambda: self.set_tp_R(3))
+        self.btn_add_pos.clicked.connect(self.add_to_portfolio)
+        self.btn_sim.clicked.connect(self.run_simulation)
+        self.spn_vol.valueChanged.connect(lambda _: self._clear_sim())
+        self.btn_log.clicked.connect(self.log_trade)
+        self.btn_size.clicked.connect(self.size_shares)
+        self.btn_grid.clicked.connect(self.toggle_grid)
+        for w in (self.spn_account, self.spn_risk):
+            w.valueChanged.connect(self.request_recalc)   # the grid's shares follow the budget
+        self.cmb_risk_unit.currentIndexChanged.connect(self.request_recalc)
+        self.btn_close_trade.clicked.connect(self.close_trade)
+        self.edt_symbol.textChanged.connect(self.request_recalc)   # re-files the alert levels
+        self.cmb_trail.currentIndexChanged.connect(self._trail_suffix)
+        self.cmb_trail.currentIndexChanged.connect(self.request_recalc)
+        self.spn_trail.valueChanged.connect(self.request_recalc)
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, self.toggle_diagnostics)
+        QShortcut(QKeySequence("Ctrl+Shift+J"), self, self.dump_profile)
 
     # ---------- logic ----------
+    # The math lives in tpslcore so batch tools get the same numbers.
     def round_tick(self, price, tick):
-        if tick <= 0: return price
-        steps = round(price / tick)
-        return steps * tick
+        return core.round_tick(price, tick)
 
     def stop_price_and_risk(self, entry, stop_pct, long, tick):
-        sp = entry * (1.0 + stop_pct) if long else entry * (1.0 - stop_pct)
-        sp = self.round_tick(sp, tick)
-        return sp, abs(entry - sp)
+        return core.stop_price_and_risk(entry, stop_pct, long, tick)
 
     def target_price(self, entry, tgt_pct, long, tick):
-        tp = entry * (1.0 + tgt_pct) if long else entry * (1.0 - tgt_pct)
-        return self.round_tick(tp, tick)
+        return core.target_price(entry, tgt_pct, long, tick)
+
+    def read_inputs(self):
+        """Current widget values as keyword args for core.plan()."""
+        return dict(
+            entry=self.spn_entry.value(),
+            current=self.spn_curr.value(),
+            shares=self.spn_shares.value(),
+            tick=self.spn_tick.value(),
+            long=(self.cmb_side.currentText() == "Long"),
+            stop_pct=self.sld_stop.value() / 10000.0,
+            tgt_pct=self.sld_tgt.value() / 10000.0,
+            flat_fee=self.spn_flat.value(),
+            ps_fee=self.spn_ps.value(),
+        )
 
     def set_tp_R(self, R):
-        entry = self.spn_entry.value()
-        tick = self.spn_tick.value()
-        long = (self.cmb_side.currentText() == "Long")
-        stop_pct = self.sld_stop.value() / 10000.0
-        stop_price, per_risk = self.stop_price_and_risk(entry, stop_pct, long, tick)
-        if per_risk <= 0: return
-        sign = 1 if long else -1
-        tgt_price = entry + sign * R * per_risk
-        tgt_pct = (tgt_price / entry - 1.0) * 100
-        self.sld_tgt.setValue(int(tgt_pct * 100))
+        i = self.read_inputs()
+        tgt_pct = core.target_pct_for_r(i["entry"], i["stop_pct"], i["long"], i["tick"], R)
+        if tgt_pct is None: return
+        self.sld_tgt.setValue(int(tgt_pct * 100 * 100))
+
+    # ---------- recalc scheduling ----------
+    def request_recalc(self, *_):
+        """Mark the plan dirty; one recalc() runs on the next event-loop turn however many inputs changed."""
+        self.recalc_requested += 1
+        if self._recalc_queued: return
+        self._recalc_queued = True
+        QTimer.singleShot(0, self._run_recalc)
+
+    def _run_recalc(self):
+        self._recalc_queued = False
         self.recalc()
 
+    @prof.timed()
     def recalc(self):
-        entry = self.spn_entry.value()
-        curr = self.spn_curr.value()
-        shares = self.spn_shares.value()
-        tick = self.spn_tick.value()
-        long = (self.cmb_side.currentText() == "Long")
-        stop_pct = self.sld_stop.value() / 10000.0
-        tgt_pct = self.sld_tgt.value() / 10000.0
-        flat_fee = self.spn_flat.value()
-        ps_fee = self.spn_ps.value()
-
-        stop_price, per_risk = self.stop_price_and_risk(entry, stop_pct, long, tick)
-        tgt_price = self.target_price(entry, tgt_pct, long, tick)
-
-        risk_amt = per_risk * shares
-        reward_ps = (tgt_price - entry) if long else (entry - tgt_price)
-        reward_amt = reward_ps * shares
+        self.recalc_executed += 1
+        i = self.read_inputs()
+        trail = self._trailing_stop(i)
+        if trail is None and (self.sld_stop.isSliderDown() or self.sld_tgt.isSliderDown()):
+            self._recalc_drag(i)
+            return
+        res = core.plan(**i, stop=None if trail is None else trail.stop)
+
+        stop_text = core.stop_label(res["stop"], res["stop_move_pct"])
+        if trail is not None:
+            stop_text += f" | trailing{' — hit' if trail.hit else ''}"
+        self.out_stop.setText(stop_text)
+        self.out_tgt.setText(core.target_label(res["target"], res["target_move_pct"]))
+        self.out_rr.setText(f"Risk ¥ {res['risk']:.0f} | Reward ¥ {res['reward']:.0f} | R {res['R']:.2f} | RR {res['RR']:.2f}")
+        self.out_pl.setText(f"Unrealized P/L: ¥{res['unreal_net']:.0f} (gross {res['unreal_gross']:.0f}) | Breakeven {res['breakeven']:.6g}")
+        self._breakeven = res["breakeven"]
+        self._update_bars(i, res["stop"], res["target"])
+
+    # ---------- trailing stop ----------
+    # (combo text, core mode); the amount box means %, ticks or an ATR multiple
+    TRAIL_MODES = [("Off", None), ("Percent", "percent"), ("Ticks", "ticks"),
+                   ("ATR", "atr"), ("Breakeven", "breakeven")]
+
+    def _trail_suffix(self, *_):
+        mode = self.TRAIL_MODES[self.cmb_trail.currentIndex()][1]
+        self.spn_trail.setSuffix({"percent": " %", "ticks": " ticks", "atr": " × ATR"}.get(mode, ""))
+        self.spn_trail.setEnabled(mode not in (None, "breakeven"))
+
+    def _trailing_stop(self, i):
+        """The TrailingStop for the current setup, fed the current price once per change; None when Off.
+
+        Changing entry, side, tick, stop % or the trail settings starts a fresh one; so do
+        shares and fees in Breakeven mode only (elsewhere they just move its breakeven).
+        """
+        mode = self.TRAIL_MODES[self.cmb_trail.currentIndex()][1]
+        if mode is None:
+            self._trail = self._trail_key = None
+            return None
+        amount = self.spn_trail.value() / 100 if mode == "percent" else self.spn_trail.value()
+        stop, _ = core.stop_price_and_risk(i["entry"], i["stop_pct"], i["long"], i["tick"])
+        be = core.breakeven_price(i["entry"], i["shares"], i["flat_fee"] + i["ps_fee"] * i["shares"], i["long"], i["tick"])
+        key = (i["entry"], i["long"], i["tick"], stop, mode, amount, be if mode == "breakeven" else None)
+        if key != self._trail_key:
+            self._trail = core.TrailingStop(i["entry"], stop, i["long"], i["tick"], mode, amount, breakeven=be)
+            self._trail_key, self._trail_px = key, None
+        self._trail.breakeven = be
+        if i["current"] != self._trail_px:
+            self._trail.update(i["current"])
+            self._trail_px = i["current"]
+        return self._trail
+
+    def _recalc_drag(self, i):
+        """Slider drag: stop/target come from the lookup tables, P/L and breakeven don't move."""
+        key = (i["entry"], i["tick"], i["long"], i["shares"])
+        stop, per_risk, risk_amt, stop_text, risk_text = self._stop_table.ensure(*key).row(self.sld_stop.value())
+        tgt, reward_ps, reward_amt, tgt_text, reward_text = self._tgt_table.ensure(*key).row(self.sld_tgt.value())
         R = 0.0 if per_risk == 0 else reward_ps / per_risk
         RR = 0.0 if risk_amt == 0 else reward_amt / risk_amt
 
-        unreal_ps = (curr - entry) if long else (entry - curr)
-        unreal_amt = unreal_ps * shares
-        fees = flat_fee + ps_fee * shares
-        unreal_net = unreal_amt - fees
-        be_shift = fees / shares if shares > 0 else 0.0
-        be_price = entry + be_shift if long else entry - be_shift
-        be_price = self.round_tick(be_price, tick)
-
-        spct = (stop_price/entry - 1.0) * (100 if long else -100)
-        tpct = (tgt_price/entry - 1.0) * (100 if long else -100)
-
-        self.out_stop.setText(f"Stop: {stop_price:.6g} | % {spct:.2f}")
-        self.out_tgt.setText(f"Target: {tgt_price:.6g} | % {tpct:.2f}")
-        self.out_rr.setText(f"Risk ¥ {risk_amt:.0f} | Reward ¥ {reward_amt:.0f} | R {R:.2f} | RR {RR:.2f}")
-        self.out_pl.setText(f"Unrealized P/L: ¥{unreal_net:.0f} (gross {unreal_amt:.0f}) | Breakeven {be_price:.6g}")
-
-        # Update embedded preview bar
-        self.preview_bar.setValues(entry, stop_price, tgt_price, curr, long)
+        self.out_stop.setText(stop_text)
+        self.out_tgt.setText(tgt_text)
+        self.out_rr.setText(f"Risk ¥ {risk_text} | Reward ¥ {reward_text} | R {R:.2f} | RR {RR:.2f}")
+        self._update_bars(i, stop, tgt)
+
+    def _update_bars(self, i, stop, target):
+        if self._sim_key is not None and self._sim_key != self._setup_key(i, stop, target):
+            self._clear_sim()   # result belonged to a different setup
+
+        # Update embedded preview bar; the overlay follows on the next event-loop turn
+        self._bar_values = (i["entry"], stop, target, i["current"], i["long"])
+        self.preview_bar.setValues(*self._bar_values)
+        self.schedule_overlay()
+        symbol = self.edt_symbol.text().strip()
+        self.levels.set("main", symbol, {"stop": stop, "target": target, "breakeven": self._breakeven})
+        self.levels.seed(symbol, i["current"])   # so the first feed tick is compared with Current
+        if self.heatmap is not None and self.heatmap.isVisible():
+            self.refresh_grid(i)
+
+    # ---------- Monte Carlo ----------
+    SIM_PATHS = 200_000
+    SIM_WORKERS = 4   # processes for the path blocks, capped at the core count; started on the first Sim
+
+    def _setup_key(self, i, stop, target):
+        return (i["entry"], i["current"], stop, target, i["long"], i["shares"], i["flat_fee"], i["ps_fee"])
+
+    def _clear_sim(self):
+        self._sim_key = None
+        self.out_mc.setText("MC: —")
+
+    def run_simulation(self):
+        """Estimate P(target before stop), E[R] and E[P/L] for the current setup off the GUI thread."""
+        if self._sim_future is not None:
+            return
+        i = self.read_inputs()
+        _, stop, target, _, _ = self._bar_values   # the levels on screen, trailed stop included
+        # paths start at Current; R stays in units of the initial risk, so a trailed
+        # stop past entry scores the profit it has locked in, not −1R
+        _, risk = core.stop_price_and_risk(i["entry"], i["stop_pct"], i["long"], i["tick"])
+        import os
+        import tpslsim
+        workers = min(self.SIM_WORKERS, os.cpu_count() or 1)
+        if self._sim_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._sim_pool = ThreadPoolExecutor(max_workers=1)
+        if self._sim_procs is None and workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            self._sim_procs = ProcessPoolExecutor(max_workers=workers)
+        self._sim_future = self._sim_pool.submit(
+            tpslsim.simulate, i["entry"], stop, target, i["long"], i["shares"], i["flat_fee"], i["ps_fee"],
+            paths=self.SIM_PATHS, vol=self.spn_vol.value() / 100, seed=0, start=i["current"], risk=risk,
+            workers=workers, executor=self._sim_procs)
+        self._sim_pending_key = self._setup_key(i, stop, target)
+        self.btn_sim.setEnabled(False)
+        self.out_mc.setText("MC: running…")
+        QTimer.singleShot(50, self._poll_simulation)
+
+    def _poll_simulation(self):
+        fut = self._sim_future
+        if not fut.done():
+            QTimer.singleShot(50, self._poll_simulation)
+            return
+        self._sim_future = None
+        self.btn_sim.setEnabled(True)
+        from concurrent.futures import BrokenExecutor
+        try:
+            mc = fut.result()
+        except ValueError as e:
+            self.out_mc.setText(f"MC: {e}")
+            return
+        except BrokenExecutor as e:   # a worker died: the next Sim starts a fresh pool
+            self._sim_procs = None
+            self.out_mc.setText(f"MC: {e}")
+            return
+        self.out_mc.setText(f"MC: P(TP first) {mc['p_target']:.1%} | P(SL) {mc['p_stop']:.1%}"
+                            f" | E[R] {mc['exp_R']:.2f} | E[P/L] ¥{mc['exp_pl']:.0f}")
+        self._sim_key = self._sim_pending_key
+        # the same levels run_simulation() took: the ones on screen, trailed stop included
+        if self._sim_key != self._setup_key(self.read_inputs(), *self._bar_values[1:3]):
+            self._clear_sim()   # inputs moved while it ran
+
+    # ---------- sizing & grid ----------
+    GRID_STEP = 50   # bp between grid cells: the sliders' single step
+
+    def risk_budget(self):
+        if self.cmb_risk_unit.currentText() == "%":
+            return core.risk_budget(self.spn_account.value(), self.spn_risk.value() / 100)
+        return core.risk_budget(self.spn_account.value(), risk_amount=self.spn_risk.value())
+
+    def size_shares(self):
+        """Set Shares from account × risk for the slider stop (tick-rounded, fees included)."""
+        i = self.read_inputs()
+        self.spn_shares.setValue(core.size_position(i["entry"], i["stop_pct"], i["long"], i["tick"],
+                                                    self.risk_budget(), i["flat_fee"], i["ps_fee"]))
+
+    def toggle_grid(self):
+        if self.heatmap is None:
+            self.heatmap = HeatmapWindow()
+            self.heatmap.picked.connect(self._pick_grid)
+        if self.heatmap.isVisible():
+            self.heatmap.hide()
+        else:
+            self.heatmap.show()
+            self.refresh_grid(self.read_inputs())
+
+    def refresh_grid(self, i):
+        """Point the heatmap at this setup's grid; sweep_grid's cache makes revisits free."""
+        grid = core.sweep_grid(i["entry"], i["tick"], i["long"], i["flat_fee"], i["ps_fee"], self.risk_budget(), 0,
+                               (self.sld_stop.minimum(), self.sld_stop.maximum()),
+                               (self.sld_tgt.minimum(), self.sld_tgt.maximum()), self.GRID_STEP)
+        self.heatmap.set_grid(grid, i["stop_pct"], i["tgt_pct"])
+
+    def _pick_grid(self, stop_bp, tgt_bp):
+        self.sld_stop.setValue(stop_bp)
+        self.sld_tgt.setValue(tgt_bp)
+
+    # ---------- trade journal ----------
+    JOURNAL_DELAY_MS = 300   # open it after the first frame (sqlite3 alone is ~15 ms of imports)
+
+    def _open_existing_journal(self):
+        """Show the stats of a journal that already exists; only Log trade creates the file."""
+        import os
+        import tpsljournal
+        if os.path.exists(self.journal_path or tpsljournal.DEFAULT_PATH):
+            self.refresh_journal()
+
+    def _ensure_journal(self):
+        """The open Journal, or None (reason shown, Log disabled) if the file can't be opened."""
+        if self.journal is None:
+            import tpsljournal
+            try:
+                self.journal = tpsljournal.Journal(self.journal_path)
+            except Exception as e:   # unreadable/locked file: the planner works without it
+                self.out_journal.setText(f"Journal: {e}")
+                self.btn_log.setEnabled(False)
+                return None
+            last = self.journal.trades(open_only=True, limit=1)
+            self._open_trade = last[0]["id"] if last else None
+        return self.journal
+
+    def log_trade(self):
+        """Record the setup on screen (trailed stop included) as an open trade."""
+        journal = self._ensure_journal()
+        if journal is None: return
+        i = self.read_inputs()
+        _, stop, target, _, _ = self._bar_values
+        self._open_trade = journal.log(
+            self.edt_symbol.text().strip(), "Long" if i["long"] else "Short", i["entry"], stop, target,
+            i["shares"], i["flat_fee"], i["ps_fee"], tag=self.edt_tag.text().strip())
+        self.refresh_journal()
+
+    def close_trade(self):
+        if self._open_trade is None: return
+        try:
+            t = self._ensure_journal().close_trade(self._open_trade, self.spn_curr.value())
+            note = f" | #{t['id']} {t['R'] or 0:+.2f}R ¥{t['pnl']:.0f}"
+        except (KeyError, ValueError):   # deleted or closed from another process
+            note = ""
+        last = self.journal.trades(open_only=True, limit=1)
+        self._open_trade = last[0]["id"] if last else None
+        self.refresh_journal(note)
+
+    def refresh_journal(self, note=""):
+        """Show the journal's running stats (one stats-row read, no scan of the trades)."""
+        journal = self._ensure_journal()
+        if journal is None: return
+        st = journal.stats()
+        self.btn_close_trade.setEnabled(self._open_trade is not None)
+        if not st["trades"]:
+            self.out_journal.setText("Journal: no closed trades" + note)
+            return
+        self.out_journal.setText(
+            f"Journal: {st['trades']} trades | win {st['win_rate']:.0%} | avg R {st['avg_R']:.2f}"
+            f" | exp ¥{st['expectancy']:.0f} | max DD {st['max_drawdown_R']:.1f}R{note}")
 
     # ---------- settings & overlay ----------
+    @prof.timed()
     def load_settings(self):
         for k, v in DEFAULTS.items():
             self.state[k] = self.settings.value(k, v, type=type(v))
 
+    @prof.timed()
     def save_settings(self):
         self.settings.setValue("entry", self.spn_entry.value())
         self.settings.setValue("current", self.spn_curr.value())
@@ -406,7 +1232,15 @@ class TPSLWidget(QWidget):
         self.settings.setValue("target_pct", self.sld_tgt.value()/100.0)
         self.settings.setValue("flat_fee", self.spn_flat.value())
         self.settings.setValue("per_share_fee", self.spn_ps.value())
+        self.settings.setValue("symbol", self.edt_symbol.text().strip())
         self.settings.setValue("always_on_top", self.chk_top.isChecked())
+        self.settings.setValue("alert_beep", self.chk_beep.isChecked())
+        self.settings.setValue("trail_mode", self.cmb_trail.currentText())
+        self.settings.setValue("trail_amount", self.spn_trail.value())
+        self.settings.setValue("tag", self.edt_tag.text().strip())
+        self.settings.setValue("account", self.spn_account.value())
+        self.settings.setValue("risk", self.spn_risk.value())
+        self.settings.setValue("risk_unit", self.cmb_risk_unit.currentText())
 
     def reset_defaults(self):
         self.spn_entry.setValue(DEFAULTS["entry"])
@@ -418,41 +1252,228 @@ class TPSLWidget(QWidget):
         self.sld_tgt.setValue(int(DEFAULTS["target_pct"]*100))
         self.spn_flat.setValue(DEFAULTS["flat_fee"])
         self.spn_ps.setValue(DEFAULTS["per_share_fee"])
+        self.edt_symbol.setText(DEFAULTS["symbol"])
         self.chk_top.setChecked(DEFAULTS["always_on_top"])
+        self.chk_beep.setChecked(DEFAULTS["alert_beep"])
+        self.cmb_trail.setCurrentText(DEFAULTS["trail_mode"])
+        self.spn_trail.setValue(DEFAULTS["trail_amount"])
+        self.edt_tag.setText(DEFAULTS["tag"])
+        self.spn_account.setValue(DEFAULTS["account"])
+        self.spn_risk.setValue(DEFAULTS["risk"])
+        self.cmb_risk_unit.setCurrentText(DEFAULTS["risk_unit"])
         self.apply_always_on_top(DEFAULTS["always_on_top"])
-        self.recalc()
 
     def apply_always_on_top(self, on):
-        flags = self.windowFlags()
-        if on:
-            flags |= Qt.WindowStaysOnTopHint
-        else:
-            flags &= ~Qt.WindowStaysOnTopHint
-        self.setWindowFlags(flags)
-        self.show()
+        if bool(self.windowFlags() & Qt.WindowStaysOnTopHint) == on:
+            return
+        # new flags recreate the native window and hide it; only re-show one that was up,
+        # so at startup the flag is set before the first (and only) show()
+        was_visible = self.isVisible()
+        self.setWindowFlag(Qt.WindowStaysOnTopHint, on)
+        if was_visible:
+            self.show()
+
+    def _ensure_overlay(self):
+        if self.overlay is None:
+            self.overlay = OverlayWindow(clock=render_clock())
+        return self.overlay
 
     def toggle_overlay(self):
-        if self.overlay.isVisible():
-            self.overlay.hide()
+        ov = self._ensure_overlay()
+        if ov.isVisible():
+            ov.hide()
         else:
             # Position near the main window
             geo = self.geometry()
-            self.overlay.move(geo.right() + 12, geo.top())
+            ov.move(geo.right() + 12, geo.top())
+            ov.show()
             self.push_to_overlay()
-            self.overlay.show()
 
+    def _ensure_portfolio(self):
+        if self.portfolio is None:
+            self.portfolio = PortfolioWindow()
+        return self.portfolio
+
+    def toggle_portfolio(self):
+        pw = self._ensure_portfolio()
+        if pw.isVisible():
+            pw.hide()
+        else:
+            geo = self.geometry()
+            pw.move(geo.left(), geo.bottom() + 40)
+            pw.show()
+
+    def dump_profile(self):
+        QToolTip.showText(self.mapToGlobal(self.rect().center()), dump_profile(), self)
+
+    def toggle_diagnostics(self):
+        if self.diagnostics is None:
+            self.diagnostics = DiagnosticsWindow(lambda: {
+                "Recalcs": f"{self.recalc_executed}/{self.recalc_requested}",
+                "Repaints skipped": ProfitBar.skipped_total,
+            })
+        if self.diagnostics.isVisible():
+            self.diagnostics.hide()
+        else:
+            self.diagnostics.show()
+
+    def add_to_portfolio(self):
+        """Copy the current setup into the portfolio table as a new position."""
+        pw = self._ensure_portfolio()
+        pw.add_position("", **self.read_inputs())
+        if not pw.isVisible():
+            self.toggle_portfolio()
+
+    def schedule_overlay(self):
+        """Queue one push_to_overlay for this event-loop turn, however many recalcs run in it."""
+        if self._overlay_queued or self.overlay is None or not self.overlay.isVisible():
+            return
+        self._overlay_queued = True
+        QTimer.singleShot(0, self.push_to_overlay)
+
+    @prof.timed()
     def push_to_overlay(self):
-        if not self.overlay.isVisible():
+        self._overlay_queued = False
+        if self.overlay is None or not self.overlay.isVisible() or self._bar_values is None:
+            return
+        self.overlay.update_values(*self._bar_values)
+
+    # ---------- local API ----------
+    def serve(self, spec):
+        """Run tpslserver on a background thread: spec = PORT, HOST:PORT or unix:PATH.
+        Position endpoints edit the Portfolio window's book on the GUI thread."""
+        import tpslserver
+        host, port, unix = "127.0.0.1", tpslserver.DEFAULT_PORT, None
+        if spec.startswith("unix:"):
+            unix = spec[5:]
+        elif spec:
+            h, _, p = spec.rpartition(":")
+            host, port = h or host, int(p)
+        self._invoker = GuiInvoker()
+        service = tpslserver.Service(PortfolioBook(self._ensure_portfolio()), self._invoker.submit)
+        self.server = tpslserver.Server(service, host, port, unix).start_thread()
+        return self.server
+
+    # ---------- live feed ----------
+    FRAME_MS = 16   # apply feed ticks at most once per ~60 Hz frame
+
+    def attach_feed(self, feed):
+        """Start a tpslfeed.Feed (or a spec like 'tcp:127.0.0.1:9000') and follow its prices.
+
+        The feed thread only updates a TickCoalescer; a frame timer here
+        drains it, so a burst of ticks becomes one spn_curr change per frame.
+        """
+        if isinstance(feed, str):
+            import tpslfeed
+            feed = tpslfeed.open_feed(feed)
+        self.detach_feed()
+        self.feed = feed
+        feed.start()
+        self._feed_timer = QTimer(self)
+        self._feed_timer.setInterval(self.FRAME_MS)
+        self._feed_timer.timeout.connect(self._drain_feed)
+        self._feed_timer.start()
+        self.lbl_feed.setText("Feed: waiting…")
+
+    def detach_feed(self):
+        if self.feed is None: return
+        self._feed_timer.stop()
+        self._feed_timer.deleteLater()
+        self.feed.stop()
+        self.feed, self._feed_timer = None, None
+        self.lbl_feed.setText("Feed: off")
+
+    def _drain_feed(self):
+        ticks = self.feed.coalescer.drain()
+        if not ticks:
+            if self.feed.error is not None:
+                self.lbl_feed.setText(f"Feed: {self.feed.error}")
             return
-        entry = self.spn_entry.value()
-        tick = self.spn_tick.value()
-        long = (self.cmb_side.currentText() == "Long")
-        stop_pct = self.sld_stop.value() / 10000.0
-        tgt_pct = self.sld_tgt.value() / 10000.0
-        stop_price, _ = self.stop_price_and_risk(entry, stop_pct, long, tick)
-        tgt_price = self.target_price(entry, tgt_pct, long, tick)
-        curr = self.spn_curr.value()
-        self.overlay.update_values(entry, stop_price, tgt_price, curr, long)
+        sym = self.edt_symbol.text().strip()
+        if sym in ticks:
+            self.spn_curr.setValue(ticks[sym])
+        hits = []
+        for s, price in ticks.items():
+            hits += [(s, price, h) for h in self.levels.move(s, price)]
+        if self.portfolio is not None:
+            levels = self.portfolio.portfolio.levels
+            for s, price in ticks.items():
+                hits += [(s, price, h) for h in levels.move(s, price)]
+                self.portfolio.set_price(s, price)
+        if hits:
+            self.fire_alerts(hits)
+        c = self.feed.coalescer
+        self.lbl_feed.setText(f"Feed: {c.received} ticks → {c.delivered} updates{self._last_alert}")
+
+    # ---------- level-cross alerts ----------
+    def fire_alerts(self, hits):
+        """hits: [(symbol, price, (level, pid, kind))] from LevelIndex.move → flash, beep, log."""
+        for sym, price, (level, pid, kind) in hits:
+            if pid == "main":
+                bars = [self.preview_bar] + ([self.overlay.bar] if self.overlay is not None else [])
+            else:
+                ov = self.portfolio.overlays.windows.get(pid)
+                bars = [ov.bar] if ov is not None else []
+            for bar in bars:
+                bar.flash(kind)
+            if self.alert_sink is not None:
+                self.alert_sink.write(sym, kind, level, price, pid)
+        self.alerts_fired += len(hits)
+        sym, price, (level, _, kind) = hits[-1]
+        self._last_alert = f" | {sym} {kind} {level:g} hit"
+        if self.chk_beep.isChecked():
+            QApplication.beep()   # once per frame, however many levels were crossed
+
+    def closeEvent(self, e):
+        self.detach_feed()
+        if self.alert_sink is not None:
+            self.alert_sink.close()
+        if self.server is not None:
+            self.server.stop()
+        if self.journal is not None:
+            self.journal.close()
+        for pool in (self._sim_pool, self._sim_procs):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        if self.heatmap is not None:
+            self.heatmap.close()
+        if self.overlay is not None:
+            self.overlay.close()
+        if self.portfolio is not None:
+            self.portfolio.overlays.close_all()
+        super().closeEvent(e)
+
+# ---------- startup timing ----------
+IMPORTED = time.perf_counter()   # module imports done
+
+
+class FirstFrame(QObject):
+    """Event filter: on the widget's first paint, report how long startup took.
+
+    Marks (ms since STARTED): imports, app (QApplication + theme), widget
+    (TPSLWidget built) and first_frame. Recorded as tpslprof "startup";
+    with --startup-time the marks are printed as JSON and the app quits.
+    """
+    def __init__(self, widget, marks, quit_after=False):
+        super().__init__(widget)
+        self.marks, self.quit_after = marks, quit_after
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, e):
+        if e.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            QTimer.singleShot(0, self._done)   # after this paint has been flushed
+        return False
+
+    def _done(self):
+        now = time.perf_counter()
+        if prof.enabled:
+            prof.record("startup", now - STARTED)
+        if self.quit_after:
+            marks = {k: (t - STARTED) * 1000 for k, t in dict(self.marks, first_frame=now).items()}
+            print(json.dumps({f"{k}_ms": round(v, 2) for k, v in marks.items()}), flush=True)
+            QApplication.instance().quit()
+
 
 # ---------- theming ----------
 
@@ -485,6 +1506,15 @@ def enable_dracula(app):
 
 
 if __name__ == "__main__":
+    # Frozen .exe: let tpslsim's worker processes start cleanly
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    # Headless batch mode: tpslbatch never touches Qt, no QApplication is created
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        import tpslbatch
+        sys.exit(tpslbatch.main(sys.argv[2:]))
+
     # Windows: set AppUserModelID so taskbar uses your icon
     if sys.platform.startswith("win"):
         import ctypes
@@ -497,6 +1527,7 @@ if __name__ == "__main__":
     QCoreApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
 
     # Create the app
+    marks = {"imports": IMPORTED}
     app = QApplication(sys.argv)
 
     # Global app icon (shows in taskbar/alt-tab/title bar)
@@ -505,9 +1536,38 @@ if __name__ == "__main__":
 
     # Theme + window
     enable_dracula(app)
+    marks["app"] = time.perf_counter()
     w = TPSLWidget()
     w.resize(560, 460)
+    marks["widget"] = time.perf_counter()
+    FirstFrame(w, marks, quit_after="--startup-time" in sys.argv[1:])
     w.show()
 
-    sys.exit(app.exec_())
+    # Live prices: --feed replay:ticks.csv | tail:PATH | pipe:PATH | tcp:HOST:PORT | udp:HOST:PORT
+    if "--feed" in sys.argv[1:-1]:
+        try:
+            w.attach_feed(sys.argv[sys.argv.index("--feed") + 1])
+        except (OSError, ValueError) as e:   # malformed spec: one line, not a traceback
+            print(f"--feed: {e}", file=sys.stderr)
+            sys.exit(2)
+    # Local JSON API for other tools: --serve 8765 | HOST:PORT | unix:PATH
+    if "--serve" in sys.argv[1:]:
+        i = sys.argv.index("--serve")
+        spec = sys.argv[i + 1] if i + 1 < len(sys.argv) and not sys.argv[i + 1].startswith("--") else ""
+        try:
+            w.serve(spec)
+        except OSError as e:
+            print(f"--serve: {e}", file=sys.stderr)
+    # Trade journal file (default ~/.cless_tpsl_journal.sqlite); read once the window is up
+    if "--journal" in sys.argv[1:-1]:
+        w.journal_path = sys.argv[sys.argv.index("--journal") + 1]
+    # Level-cross alert lines: --alerts alerts.log | udp:HOST:PORT
+    if "--alerts" in sys.argv[1:-1]:
+        import tpslfeed
+        w.alert_sink = tpslfeed.open_sink(sys.argv[sys.argv.index("--alerts") + 1])
+
+    rc = app.exec_()
+    if prof.enabled:
+        print(f"--profile: {dump_profile()}", file=sys.stderr)
+    sys.exit(rc)
 
@@ -0,0 +1,776 @@
+# Cless TP/SL — calculation core (no Qt)
+# ----------------------------------------------------------------
+# The TP/SL math used by the desktop widget, as plain functions.
+# Import this from scripts/notebooks without loading PyQt5.
+#
+# Percent inputs are fractions here (−0.04 = −4 %), exactly what
+# TPSLWidget.recalc() passes (slider value / 10000).
+#
+# NumPy is imported inside the batch functions that use it, so the
+# scalar path the widget needs at startup never loads it.
+# ----------------------------------------------------------------
+
+import bisect
+import functools
+import math
+from decimal import Decimal
+
+
+# Trade-setup defaults (percents as stored in the settings, -4.0 = -4 %)
+DEFAULTS = {
+    "entry": 115.0,
+    "current": 119.72,
+    "shares": 100,
+    "tick": 0.01,
+    "side": "Long",    # Long/Short
+    "stop_pct": -4.0,
+    "target_pct": 8.0,
+    "flat_fee": 0.0,
+    "per_share_fee": 0.0,
+}
+
+
+# ---------- tick grid ----------
+# Prices on the tick grid are held as integer tick counts and only turned
+# into decimals for display, so 115 − 110.4 is exactly 460 ticks rather
+# than 4.599999999999994, and results are bit-identical on every machine.
+_TICK_SCALES = {}
+
+def tick_scale(tick):
+    """tick → (units, scale) with tick == units / scale as decimals, e.g. 0.05 → (5, 100).
+
+    Ticks with more than 9 decimals fall back to (tick, 1), i.e. plain floats.
+    """
+    sc = _TICK_SCALES.get(tick)
+    if sc is None:
+        d = max(0, -Decimal(repr(float(tick))).normalize().as_tuple().exponent)
+        sc = (round(tick * 10**d), 10**d) if d <= 9 else (tick, 1)
+        _TICK_SCALES[tick] = sc
+    return sc
+
+
+def price_to_ticks(price, tick):
+    """Nearest whole number of ticks (the same rounding round_tick always used)."""
+    return round(price / tick)
+
+
+def ticks_to_price(n, tick):
+    """Tick count → float price, correctly rounded from the exact decimal (119.72, not 119.72000000000001)."""
+    units, scale = tick_scale(tick)
+    return n * units / scale
+
+
+def ticks_to_decimal(n, tick):
+    """Tick count → exact Decimal, for display or as a hashable price level."""
+    units, scale = tick_scale(tick)
+    if scale == 1 and not isinstance(units, int):
+        return Decimal(repr(n * units))
+    return Decimal(n * units).scaleb(-(len(str(scale)) - 1))
+
+
+# ---------- single position ----------
+def round_tick(price, tick):
+    if tick <= 0: return price
+    return ticks_to_price(price_to_ticks(price, tick), tick)
+
+
+def _grid_ticks(price, tick):
+    """Tick count of price if it sits exactly on the tick grid, else None."""
+    if tick <= 0: return None
+    n = price_to_ticks(price, tick)
+    return n if ticks_to_price(n, tick) == price else None
+
+
+def _level(entry, pct, long, tick):
+    """Entry moved by pct (Long up / Short down) → (tick-rounded price, tick count or 0)."""
+    raw = entry * (1.0 + pct) if long else entry * (1.0 - pct)
+    if tick <= 0: return raw, 0
+    n = price_to_ticks(raw, tick)
+    return ticks_to_price(n, tick), n
+
+
+def _amounts(dist, dist_t, shares, tick):
+    """(per share, × shares) for a price distance; whole-tick integer math when dist_t is known."""
+    if dist_t is None:
+        return dist, dist * shares
+    per_share = ticks_to_price(dist_t, tick)
+    if float(shares).is_integer():
+        return per_share, ticks_to_price(dist_t * int(shares), tick)
+    return per_share, per_share * shares
+
+
+def stop_price_and_risk(entry, stop_pct, long, tick):
+    sp, sp_t = _level(entry, stop_pct, long, tick)
+    entry_t = _grid_ticks(entry, tick)
+    if entry_t is None:
+        return sp, abs(entry - sp)
+    return sp, ticks_to_price(abs(entry_t - sp_t), tick)
+
+
+def target_price(entry, tgt_pct, long, tick):
+    return _level(entry, tgt_pct, long, tick)[0]
+
+
+def _breakeven(entry, shares, fees, long, tick):
+    be_shift = fees / shares if shares > 0 else 0.0
+    be = entry + be_shift if long else entry - be_shift
+    if tick <= 0: return be, 0
+    n = price_to_ticks(be, tick)
+    return ticks_to_price(n, tick), n
+
+
+def breakeven_price(entry, shares, fees, long, tick):
+    """Entry shifted by the per-share cost of fees, rounded to tick."""
+    return _breakeven(entry, shares, fees, long, tick)[0]
+
+
+def target_pct_for_r(entry, stop_pct, long, tick, R):
+    """Target % (fraction, in the side's convention like tgt_pct) that puts TP at
+    R × per-share risk beyond entry, or None if risk is 0."""
+    _, per_risk = stop_price_and_risk(entry, stop_pct, long, tick)
+    if per_risk <= 0 or entry == 0: return None
+    sign = 1 if long else -1
+    tgt_price = entry + sign * R * per_risk
+    return sign * (tgt_price / entry - 1.0)
+
+
+def risk_budget(account, risk_pct=0.0, risk_amount=None):
+    """Currency that may be lost on one trade: risk_amount when given, else risk_pct (fraction) of account."""
+    return float(risk_amount) if risk_amount is not None else account * risk_pct
+
+
+def size_position(entry, stop_pct, long, tick, budget, flat_fee=0.0, ps_fee=0.0, stop=None):
+    """Most whole shares whose stop-out loss plus fees stays within budget; 0 if none fit.
+
+    Per-share risk is stop_price_and_risk()'s tick-rounded one (|entry − stop| for a
+    stop price); fees are plan()'s: flat_fee + ps_fee × shares.
+    """
+    per_risk = stop_price_and_risk(entry, stop_pct, long, tick)[1] if stop is None else abs(entry - stop)
+    return _shares_for(budget, per_risk, flat_fee, ps_fee)
+
+
+def _shares_for(budget, per_risk, flat_fee, ps_fee):
+    cost = per_risk + ps_fee
+    if cost <= 0 or budget <= flat_fee: return 0
+    n = math.floor((budget - flat_fee) / cost)
+    if n * cost + flat_fee > budget: n -= 1   # float floor landed one share over
+    return max(0, n)
+
+
+def plan(entry, current, shares, tick, long, stop_pct, tgt_pct, flat_fee=0.0, ps_fee=0.0, stop=None):
+    """Everything recalc() shows for one position, as a dict of floats.
+
+    stop_t / target_t / breakeven_t are the same levels as tick counts
+    (0 when tick <= 0) — stable keys for hashing and de-duplication.
+    stop: a stop price to use instead of stop_pct (e.g. a TrailingStop's).
+    Its risk is signed: negative once the stop has locked in profit (R, RR are then 0).
+    """
+    entry_t = _grid_ticks(entry, tick)
+    current_t = _grid_ticks(current, tick)
+    sgn = 1 if long else -1
+    if stop is None:
+        stop, stop_t = _level(entry, stop_pct, long, tick)
+        stop_exact, rsgn = True, None
+    else:
+        stop_t = _grid_ticks(stop, tick)
+        stop_exact, rsgn = stop_t is not None, sgn
+        stop_t = stop_t or 0
+    target, target_t = _level(entry, tgt_pct, long, tick)
+
+    # With entry on the grid every level is too: distances are whole ticks
+    exact = entry_t is not None
+    dist, dist_t = (abs(entry - stop), abs(entry_t - stop_t) if exact else 0) if rsgn is None else \
+        (rsgn * (entry - stop), rsgn * (entry_t - stop_t) if exact else 0)
+    per_risk, risk_amt = _amounts(dist, dist_t if exact and stop_exact else None, shares, tick)
+    reward_ps, reward_amt = _amounts(sgn * (target - entry), sgn * (target_t - entry_t) if exact else None, shares, tick)
+    R = 0.0 if per_risk <= 0 else reward_ps / per_risk
+    RR = 0.0 if risk_amt <= 0 else reward_amt / risk_amt
+
+    exact = exact and current_t is not None
+    _, unreal_amt = _amounts(sgn * (current - entry), sgn * (current_t - entry_t) if exact else None, shares, tick)
+    fees = flat_fee + ps_fee * shares
+    be, be_t = _breakeven(entry, shares, fees, long, tick)
+
+    sign = 100 if long else -100
+    spct = (stop / entry - 1.0) * sign if entry else 0.0
+    tpct = (target / entry - 1.0) * sign if entry else 0.0
+
+    return {
+        "stop": stop, "target": target,
+        "stop_move_pct": spct, "target_move_pct": tpct,
+        "per_risk": per_risk, "reward_ps": reward_ps,
+        "risk": risk_amt, "reward": reward_amt, "R": R, "RR": RR,
+        "fees": fees, "unreal_gross": unreal_amt, "unreal_net": unreal_amt - fees,
+        "breakeven": be,
+        "stop_t": stop_t, "target_t": target_t,
+        "breakeven_t": be_t,
+    }
+
+
+def stop_label(stop, move_pct):
+    return f"Stop: {stop:.6g} | % {move_pct:.2f}"
+
+
+def target_label(target, move_pct):
+    return f"Target: {target:.6g} | % {move_pct:.2f}"
+
+
+# ---------- batches (NumPy) ----------
+def side_mask(side):
+    """Long/Short column → bool array (True = Long). Accepts strings (Long/Short, L/S) or bools."""
+    import numpy as np
+    s = np.asarray(side)
+    if s.dtype.kind in "USO":
+        first = s.astype(str).astype("U1")
+        return (first == "L") | (first == "l")
+    return s.astype(bool)
+
+
+class TickGrid:
+    """Per-row tick_scale() for an array of ticks (computed once per distinct tick).
+
+    Tick counts are kept as int64; conversion to price is n * units / scale,
+    the same exact-decimal rounding as ticks_to_price().
+    """
+    def __init__(self, tick):
+        import numpy as np
+        self.tick = np.asarray(tick, dtype=np.float64)
+        flat = self.tick.ravel()
+        if flat.size and flat.min() == flat.max():   # the usual case: one tick for the whole batch
+            uniq, inv = flat[:1], np.zeros(flat.size, dtype=np.intp)
+        else:
+            uniq, inv = np.unique(flat, return_inverse=True)
+        sc = [tick_scale(t) if t > 0 else (0.0, 1) for t in uniq.tolist()]
+        self.units = np.array([u for u, _ in sc], dtype=np.float64)[inv].reshape(self.tick.shape)
+        self.scale = np.array([s for _, s in sc], dtype=np.float64)[inv].reshape(self.tick.shape)
+        self.valid = self.tick > 0
+
+    def to_ticks(self, price):
+        import numpy as np
+        with np.errstate(divide="ignore", invalid="ignore"):
+            n = np.round(price / self.tick)
+        return np.where(self.valid, n, 0).astype(np.int64)
+
+    def to_price(self, n):
+        return n * self.units / self.scale
+
+    def round(self, price):
+        """round_tick over arrays → (price, int64 tick counts); tick <= 0 rows pass through with 0."""
+        import numpy as np
+        n = self.to_ticks(price)
+        return np.where(self.valid, self.to_price(n), price), n
+
+    def on_grid(self, price):
+        """int64 tick counts and a mask of rows whose price sits exactly on the grid."""
+        n = self.to_ticks(price)
+        return n, self.valid & (self.to_price(n) == price)
+
+
+def round_tick_batch(price, tick):
+    import numpy as np
+    return TickGrid(tick).round(np.asarray(price, dtype=np.float64))[0]
+
+
+def _div0(a, b):
+    import numpy as np
+    return np.divide(a, b, out=np.zeros(np.broadcast(a, b).shape), where=(b != 0))
+
+
+def _amounts_batch(grid, exact, dist, dist_t, shares):
+    """Vectorized _amounts(): rows in `exact` use whole-tick integer math."""
+    import numpy as np
+    per_share = np.where(exact, grid.to_price(dist_t), dist)
+    whole = exact & (shares == np.floor(shares))
+    shares_i = np.where(whole, shares, 0).astype(np.int64)
+    return per_share, np.where(whole, grid.to_price(dist_t * shares_i), per_share * shares)
+
+
+def _levels(grid, entry, long, stop_pct, tgt_pct, shares, stop_px=None):
+    """Stop/target levels and their per-share and × shares amounts, like plan().
+    stop_px: stop prices overriding stop_pct where not NaN (plan()'s stop=)."""
+    import numpy as np
+    entry_t, exact = grid.on_grid(entry)
+    stop, stop_t = grid.round(np.where(long, entry * (1.0 + stop_pct), entry * (1.0 - stop_pct)))
+    sgn = np.where(long, 1, -1)
+    dist, dist_t, stop_exact = np.abs(entry - stop), np.abs(entry_t - stop_t), exact
+    if stop_px is not None:
+        given = ~np.isnan(stop_px)
+        stop = np.where(given, stop_px, stop)
+        stop_t, on = grid.on_grid(stop)
+        stop_t = np.where(on | ~given, stop_t, 0)   # off-grid stop: 0, as in plan()
+        stop_exact = exact & (on | ~given)
+        dist = np.where(given, sgn * (entry - stop), np.abs(entry - stop))   # signed, as in plan()
+        dist_t = np.where(given, sgn * (entry_t - stop_t), np.abs(entry_t - stop_t))
+    target, target_t = grid.round(np.where(long, entry * (1.0 + tgt_pct), entry * (1.0 - tgt_pct)))
+    risk = _amounts_batch(grid, stop_exact, dist, dist_t, shares)
+    reward = _amounts_batch(grid, exact, sgn * (target - entry), sgn * (target_t - entry_t), shares)
+    return stop, stop_t, target, target_t, risk, reward
+
+
+def levels_batch(entry, tick, long, stop_pct, tgt_pct):
+    """Vectorized stop_price_and_risk + target_price → (stop, per_risk, target)."""
+    import numpy as np
+    entry, tick, long, stop_pct, tgt_pct = np.broadcast_arrays(
+        np.asarray(entry, dtype=np.float64), np.asarray(tick, dtype=np.float64), np.asarray(long, dtype=bool),
+        np.asarray(stop_pct, dtype=np.float64), np.asarray(tgt_pct, dtype=np.float64))
+    stop, _, target, _, (per_risk, _), _ = _levels(TickGrid(tick), entry, long, stop_pct, tgt_pct, 0.0)
+    return stop, per_risk, target
+
+
+def plan_batch(entry, current, shares, tick, side, stop_pct, tgt_pct, flat_fee=0.0, ps_fee=0.0, stop=None):
+    """plan() over arrays in one vectorized pass; scalars broadcast.
+
+    Returns a dict with the same keys as plan(): float64 arrays, and int64
+    tick counts for stop_t / target_t / breakeven_t.
+    Row-for-row the numbers are identical to plan().
+    stop: stop prices (e.g. TrailingBatch.stop) used instead of stop_pct; NaN rows keep stop_pct.
+    """
+    import numpy as np
+    long = side_mask(side)
+    entry, current, shares, tick, long, stop_pct, tgt_pct, flat_fee, ps_fee, stop_px = np.broadcast_arrays(
+        *(np.asarray(a, dtype=np.float64) for a in (entry, current, shares, tick)),
+        long,
+        *(np.asarray(a, dtype=np.float64) for a in (stop_pct, tgt_pct, flat_fee, ps_fee)),
+        np.asarray(np.nan if stop is None else stop, dtype=np.float64),
+    )
+    grid = TickGrid(tick)
+
+    stop, stop_t, target, target_t, (per_risk, risk_amt), (reward_ps, reward_amt) = _levels(
+        grid, entry, long, stop_pct, tgt_pct, shares, None if stop is None else stop_px)
+    R = np.where(per_risk > 0, _div0(reward_ps, per_risk), 0.0)
+    RR = np.where(risk_amt > 0, _div0(reward_amt, risk_amt), 0.0)
+
+    entry_t, exact = grid.on_grid(entry)
+    current_t, cur_exact = grid.on_grid(current)
+    sgn = np.where(long, 1, -1)
+    _, unreal_amt = _amounts_batch(grid, exact & cur_exact, sgn * (current - entry), sgn * (current_t - entry_t), shares)
+    fees = flat_fee + ps_fee * shares
+    be_shift = _div0(fees, np.where(shares > 0, shares, 0.0))
+    breakeven, breakeven_t = grid.round(np.where(long, entry + be_shift, entry - be_shift))
+
+    sign = np.where(long, 100.0, -100.0)
+    spct = np.where(entry != 0, (_div0(stop, entry) - 1.0) * sign, 0.0)
+    tpct = np.where(entry != 0, (_div0(target, entry) - 1.0) * sign, 0.0)
+
+    return {
+        "stop": stop, "target": target,
+        "stop_move_pct": spct, "target_move_pct": tpct,
+        "per_risk": per_risk, "reward_ps": reward_ps,
+        "risk": risk_amt, "reward": reward_amt, "R": R, "RR": RR,
+        "fees": fees, "unreal_gross": unreal_amt, "unreal_net": unreal_amt - fees,
+        "breakeven": breakeven,
+        "stop_t": stop_t, "target_t": target_t, "breakeven_t": breakeven_t,
+    }
+
+
+# ---------- stop/target grid ----------
+def _shares_batch(budget, per_risk, flat_fee, ps_fee):
+    """Vectorized _shares_for()."""
+    import numpy as np
+    cost = per_risk + ps_fee
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n = np.floor(_div0(budget - flat_fee, cost))
+    n = np.where(n * cost + flat_fee > budget, n - 1, n)
+    return np.where((cost > 0) & (budget > flat_fee), np.maximum(n, 0), 0).astype(np.int64)
+
+
+def sweep(entry, tick, long, stop_pcts, tgt_pcts, flat_fee=0.0, ps_fee=0.0, budget=None, shares=0):
+    """Every stop % × target % (fractions) for one setup in one vectorized pass.
+
+    Returns stop / per_risk / shares per stop % (length S), target per target %
+    (length T), and R, RR, risk, reward as S × T matrices — the numbers plan()
+    gives for each pair. With a budget, shares are size_position()'s for each
+    stop; otherwise the fixed `shares`.
+    """
+    import numpy as np
+    sp = np.asarray(stop_pcts, dtype=np.float64)
+    tp = np.asarray(tgt_pcts, dtype=np.float64)
+    stop, per_risk, _ = levels_batch(entry, tick, long, sp, 0.0)
+    if budget is None:
+        n = np.full(sp.shape, int(shares), dtype=np.int64)
+    else:
+        n = _shares_batch(float(budget), per_risk, flat_fee, ps_fee)
+
+    shape = (len(sp), len(tp))
+    entry_a, tick_a, long_a = (np.full(shape, v) for v in (float(entry), float(tick), bool(long)))
+    sp_a, tp_a, n_a = np.broadcast_arrays(sp[:, None], tp[None, :], n[:, None].astype(np.float64))
+    _, _, target, _, (per_risk_a, risk_amt), (reward_ps, reward_amt) = _levels(
+        TickGrid(tick_a), entry_a, long_a, sp_a, tp_a, n_a)
+    return {
+        "stop_pct": sp, "target_pct": tp,
+        "stop": stop, "per_risk": per_risk, "shares": n, "target": target[0],
+        "R": np.where(per_risk_a > 0, _div0(reward_ps, per_risk_a), 0.0),
+        "RR": np.where(risk_amt > 0, _div0(reward_amt, risk_amt), 0.0),
+        "risk": risk_amt, "reward": reward_amt,
+    }
+
+
+@functools.lru_cache(maxsize=32)
+def sweep_grid(entry, tick, long, flat_fee=0.0, ps_fee=0.0, budget=None, shares=0,
+               stop_range=(-5000, 5000), tgt_range=(-5000, 10000), step=50):
+    """sweep() over basis-point slider ranges (both ends included), memoized.
+
+    Keyed on entry, tick, side, fees and sizing (plus the ranges), so going
+    back to a setup already seen returns the same, read-only arrays.
+    """
+    import numpy as np
+    res = sweep(entry, tick, long, np.arange(stop_range[0], stop_range[1] + 1, step) / 10000.0,
+                np.arange(tgt_range[0], tgt_range[1] + 1, step) / 10000.0, flat_fee, ps_fee, budget, shares)
+    for a in res.values():
+        a.setflags(write=False)
+    return res
+
+
+# ---------- trailing stops ----------
+TRAIL_MODES = ("percent", "ticks", "atr", "breakeven")
+
+
+class TrailingStop:
+    """A stop that follows the price for one position, O(1) per update.
+
+    mode / amount:
+      "percent"    amount = fraction behind the best price (0.03 = 3 %)
+      "ticks"      amount = whole ticks behind the best price
+      "atr"        amount = ATR multiple; ATR is Wilder's average true range
+                   over `period` updates (or seed it with atr=)
+      "breakeven"  the initial stop until price is +1R, then breakeven
+    The running state is the best price so far and the ATR; nothing looks
+    back over history. The stop only ever tightens and stays on the tick grid.
+    """
+    def __init__(self, entry, stop, long=True, tick=0.01, mode="percent", amount=0.03,
+                 period=14, atr=None, breakeven=None):
+        if mode not in TRAIL_MODES:
+            raise ValueError(f"unknown trailing mode {mode!r} (use {', '.join(TRAIL_MODES)})")
+        self.entry, self.long, self.tick = entry, long, tick
+        self.mode, self.amount, self.period = mode, amount, period
+        self.initial = self.stop = stop
+        self.per_risk = abs(entry - stop)
+        self.breakeven = entry if breakeven is None else breakeven
+        self.best = entry      # high-water mark (Long) / low-water mark (Short)
+        self.atr = atr         # None until `period` true ranges have been seen
+        self._tr_sum = 0.0
+        self._n = 0
+        self._prev = entry     # previous close, for the true range
+        self.hit = False       # price reached the stop in force at some update
+
+    def update(self, price, high=None, low=None):
+        """One new price (or a bar's close with its high/low) → the stop now in force."""
+        hi = price if high is None else high
+        lo = price if low is None else low
+        if self.mode == "atr":
+            tr = max(hi - lo, abs(hi - self._prev), abs(lo - self._prev))
+            if self.atr is None:
+                self._tr_sum += tr
+                self._n += 1
+                if self._n >= self.period:
+                    self.atr = self._tr_sum / self._n
+            else:
+                self.atr = self.atr + (tr - self.atr) / self.period
+        self._prev = price
+
+        # judged against the stop before this update tightens it
+        if (lo <= self.stop) if self.long else (hi >= self.stop):
+            self.hit = True
+        self.best = max(self.best, hi) if self.long else min(self.best, lo)
+        cand = self._candidate()
+        if cand is not None and ((cand > self.stop) if self.long else (cand < self.stop)):
+            self.stop = cand
+        return self.stop
+
+    def _candidate(self):
+        sgn = 1 if self.long else -1
+        if self.mode == "percent":
+            raw = self.best * (1.0 - sgn * self.amount)
+        elif self.mode == "ticks":
+            raw = self.best - sgn * self.amount * self.tick
+        elif self.mode == "atr":
+            if self.atr is None: return None
+            raw = self.best - sgn * self.amount * self.atr
+        else:
+            if self.per_risk <= 0 or sgn * (self.best - self.entry) < self.per_risk: return None
+            raw = self.breakeven
+        return round_tick(raw, self.tick)
+
+
+class TrailingBatch:
+    """TrailingStop for many positions at once: one vectorized update() per tick
+    moves every stop. Rows with a NaN price are left as they are. Row for row
+    the stops equal TrailingStop's. Per-row arguments broadcast like plan_batch.
+    """
+    def __init__(self, entry, stop, side="Long", tick=0.01, mode="percent", amount=0.03,
+                 period=14, atr=None, breakeven=None):
+        import numpy as np
+        long = side_mask(side)
+        mode = np.asarray(mode)
+        entry, stop, long, tick, amount, period, atr, breakeven, mode = np.broadcast_arrays(
+            np.asarray(entry, dtype=np.float64), np.asarray(stop, dtype=np.float64), long,
+            *(np.asarray(a, dtype=np.float64) for a in (tick, amount, period)),
+            np.asarray(np.nan if atr is None else atr, dtype=np.float64),
+            np.asarray(np.nan if breakeven is None else breakeven, dtype=np.float64),
+            mode,
+        )
+        uniq, inv = np.unique(mode, return_inverse=True)
+        for m in uniq.tolist():
+            if m not in TRAIL_MODES:
+                raise ValueError(f"unknown trailing mode {m!r} (use {', '.join(TRAIL_MODES)})")
+        self.mode = np.array([TRAIL_MODES.index(m) for m in uniq.tolist()], dtype=np.int8)[inv].reshape(entry.shape)
+        self.entry, self.long, self.tick, self.amount, self.period = entry, long, tick, amount, period
+        self.initial = stop.copy()
+        self.stop = stop.copy()
+        self.per_risk = np.abs(entry - stop)
+        self.breakeven = np.where(np.isnan(breakeven), entry, breakeven)
+        self.best = entry.copy()
+        self.atr = atr.copy()
+        self._tr_sum = np.zeros(entry.shape)
+        self._n = np.zeros(entry.shape, dtype=np.int64)
+        self._prev = entry.copy()
+        self.hit = np.zeros(entry.shape, dtype=bool)
+        self._grid = TickGrid(tick)
+        self._sgn = np.where(long, 1.0, -1.0)
+
+    def __len__(self):
+        return len(self.stop)
+
+    def update(self, price, high=None, low=None):
+        """Prices (NaN = no tick for that row) → the stop array now in force."""
+        import numpy as np
+        price = np.broadcast_to(np.asarray(price, dtype=np.float64), self.stop.shape)
+        hi = price if high is None else np.broadcast_to(np.asarray(high, dtype=np.float64), price.shape)
+        lo = price if low is None else np.broadcast_to(np.asarray(low, dtype=np.float64), price.shape)
+        live = ~np.isnan(price)
+        long, sgn = self.long, self._sgn
+
+        is_atr = live & (self.mode == 2)
+        tr = np.maximum(hi - lo, np.maximum(np.abs(hi - self._prev), np.abs(lo - self._prev)))
+        warming = is_atr & np.isnan(self.atr)
+        smooth = is_atr & ~warming
+        self._tr_sum = np.where(warming, self._tr_sum + tr, self._tr_sum)
+        self._n += warming
+        with np.errstate(invalid="ignore"):
+            atr = np.where(smooth, self.atr + (tr - self.atr) / self.period, self.atr)
+            self.atr = np.where(warming & (self._n >= self.period), self._tr_sum / np.maximum(self._n, 1), atr)
+        self._prev = np.where(live, price, self._prev)
+
+        with np.errstate(invalid="ignore"):
+            self.hit |= live & np.where(long, lo <= self.stop, hi >= self.stop)
+            self.best = np.where(live, np.where(long, np.maximum(self.best, hi), np.minimum(self.best, lo)), self.best)
+            be_ready = (self.per_risk > 0) & (sgn * (self.best - self.entry) >= self.per_risk)
+            raw = np.select(
+                [self.mode == 0, self.mode == 1, self.mode == 2],
+                [self.best * (1.0 - sgn * self.amount), self.best - sgn * self.amount * self.tick,
+                 self.best - sgn * self.amount * self.atr],
+                np.where(be_ready, self.breakeven, np.nan))
+            cand = self._grid.round(raw)[0]
+            tighter = live & ~np.isnan(raw) & np.where(long, cand > self.stop, cand < self.stop)
+        self.stop = np.where(tighter, cand, self.stop)
+        return self.stop
+
+
+# ---------- portfolio ----------
+class Portfolio:
+    """Many positions plus running totals.
+
+    Each position keeps its last plan() row; changing one position
+    subtracts its old contribution and adds the new one, so an update
+    costs O(1) regardless of how many positions are open.
+    """
+    TOTAL_KEYS = ("risk", "reward", "unreal_gross", "unreal_net")
+    RESUM_EVERY = 4096   # re-add from scratch now and then to shed float drift
+
+    def __init__(self, account=0.0):
+        self.account = account
+        self.positions = {}    # pid → {"symbol": ..., **plan() kwargs}
+        self.rows = {}         # pid → plan() result
+        self.by_symbol = {}    # symbol → set(pid)
+        self.levels = LevelIndex()   # stops/targets/breakevens, for cross alerts
+        self.totals = dict.fromkeys(self.TOTAL_KEYS, 0.0)
+        self._next_id = 1
+        self._since_resum = 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _plan(self, pos):
+        return plan(**{k: v for k, v in pos.items() if k != "symbol"})
+
+    def _apply(self, old, new):
+        for k in self.TOTAL_KEYS:
+            self.totals[k] += (new[k] if new else 0.0) - (old[k] if old else 0.0)
+        self._since_resum += 1
+        if self._since_resum >= self.RESUM_EVERY:
+            self.resum()
+
+    def add(self, symbol="", entry=DEFAULTS["entry"], current=DEFAULTS["current"],
+            shares=DEFAULTS["shares"], tick=DEFAULTS["tick"], long=True,
+            stop_pct=DEFAULTS["stop_pct"] / 100, tgt_pct=DEFAULTS["target_pct"] / 100,
+            flat_fee=0.0, ps_fee=0.0):
+        """Open a position (same arguments as plan(), plus symbol). Returns its id.
+        If plan() rejects the inputs, its error propagates and nothing is added."""
+        pos = dict(symbol=symbol, entry=entry, current=current, shares=shares, tick=tick, long=long,
+                   stop_pct=stop_pct, tgt_pct=tgt_pct, flat_fee=flat_fee, ps_fee=ps_fee)
+        row = self._plan(pos)
+        pid = self._next_id; self._next_id += 1
+        self.positions[pid] = pos
+        self.by_symbol.setdefault(symbol, set()).add(pid)
+        self.rows[pid] = row
+        self.levels.set_plan(pid, symbol, row)
+        self.levels.seed(symbol, current)
+        self._apply(None, row)
+        return pid
+
+    def update(self, pid, **changes):
+        """Change some inputs of one position; only its share of the totals moves.
+        If plan() rejects the new inputs, its error propagates and the position is unchanged."""
+        pos = self.positions[pid]
+        row = self._plan(dict(pos, **changes))
+        if "symbol" in changes and changes["symbol"] != pos["symbol"]:
+            self.by_symbol[pos["symbol"]].discard(pid)
+            self.by_symbol.setdefault(changes["symbol"], set()).add(pid)
+        pos.update(changes)
+        old = self.rows[pid]
+        self.rows[pid] = row
+        self.levels.set_plan(pid, pos["symbol"], row)
+        self.levels.seed(pos["symbol"], pos["current"])
+        self._apply(old, row)
+        return row
+
+    def set_price(self, symbol, price):
+        """New current price for every position in symbol. Returns the pids touched."""
+        pids = list(self.by_symbol.get(symbol, ()))
+        for pid in pids:
+            self.update(pid, current=price)
+        return pids
+
+    def remove(self, pid):
+        pos = self.positions.pop(pid)
+        self.by_symbol[pos["symbol"]].discard(pid)
+        self.levels.remove(pid)
+        self._apply(self.rows.pop(pid), None)
+
+    def resum(self):
+        """Rebuild the totals from the cached rows (exact sum, no replanning)."""
+        self._since_resum = 0
+        for k in self.TOTAL_KEYS:
+            self.totals[k] = math.fsum(r[k] for r in self.rows.values())
+
+    def risk_share(self):
+        """Total risk as % of account (0 when no account size is set)."""
+        return self.totals["risk"] / self.account * 100 if self.account > 0 else 0.0
+
+
+# ---------- level index ----------
+class LevelIndex:
+    """Every active stop / target / breakeven level, per symbol, in one sorted list.
+
+    crossed(symbol, p0, p1) bisects for the levels a move from p0 to p1
+    passed, so a tick costs O(log n + hits) however many positions are
+    watched. A level counts as crossed when the price reaches it.
+    """
+    KINDS = ("stop", "target", "breakeven")
+
+    def __init__(self):
+        self._levels = {}   # symbol → [(price, pid, kind)] sorted by price
+        self._prices = {}   # symbol → just the prices, for bisect (pids of any type never get compared)
+        self._of = {}       # pid → (symbol, its entries)
+        self._last = {}     # symbol → last price seen by move() (or seed())
+
+    def __len__(self):
+        return sum(len(v) for v in self._levels.values())
+
+    def set(self, pid, symbol, levels):
+        """Replace pid's levels with {kind: price}; unchanged levels cost one compare."""
+        entries = tuple(sorted((price, pid, kind) for kind, price in levels.items() if price > 0))
+        if self._of.get(pid) == (symbol, entries):
+            return
+        self.remove(pid)
+        lv = self._levels.setdefault(symbol, [])
+        prices = self._prices.setdefault(symbol, [])
+        for e in entries:
+            i = bisect.bisect_right(prices, e[0])
+            prices.insert(i, e[0]); lv.insert(i, e)
+        self._of[pid] = (symbol, entries)
+
+    def set_plan(self, pid, symbol, res):
+        """Index the stop, target and breakeven of a plan() row."""
+        self.set(pid, symbol, {k: res[k] for k in self.KINDS})
+
+    def remove(self, pid):
+        old = self._of.pop(pid, None)
+        if old is None: return
+        symbol, entries = old
+        lv, prices = self._levels[symbol], self._prices[symbol]
+        for e in entries:
+            i = lv.index(e, bisect.bisect_left(prices, e[0]))
+            del lv[i], prices[i]
+        if not lv:
+            del self._levels[symbol], self._prices[symbol]
+
+    def crossed(self, symbol, p0, p1):
+        """[(price, pid, kind)] reached moving p0 → p1, in the order they were passed."""
+        lv = self._levels.get(symbol)
+        if not lv or p0 == p1:
+            return []
+        prices = self._prices[symbol]
+        if p1 > p0:   # up: p0 < level <= p1
+            return lv[bisect.bisect_right(prices, p0):bisect.bisect_right(prices, p1)]
+        # down: p1 <= level < p0
+        return lv[bisect.bisect_left(prices, p1):bisect.bisect_left(prices, p0)][::-1]
+
+    def seed(self, symbol, price):
+        """Price a symbol's first move() is measured from (e.g. a position's current),
+        unless move() has already seen one."""
+        self._last.setdefault(symbol, price)
+
+    def move(self, symbol, price):
+        """Record a new price for symbol → levels crossed since its previous (or seeded) price.
+
+        A price that lands on a level and bounces back (pids of any type):
+        >>> li = LevelIndex(); li.set("main", "X", {"stop": 110.4}); li.set(1, "X", {"stop": 110.4})
+        >>> li.move("X", 111), li.move("X", 110.4), li.move("X", 112)
+        ([], [(110.4, 1, 'stop'), (110.4, 'main', 'stop')], [])
+        """
+        last = self._last.get(symbol)
+        self._last[symbol] = price
+        return [] if last is None else self.crossed(symbol, last, price)
+
+
+# ---------- slider lookup tables ----------
+class SliderTable:
+    """Every position of a basis-point slider → tick-rounded price, per-share and
+    total amount, and preformatted label text.
+
+    Built in one vectorized pass for a given (entry, tick, side, shares) and
+    reused until one of those changes, so a drag step is a list lookup.
+    kind "stop" stores per-share risk, kind "target" per-share reward.
+    """
+    def __init__(self, lo, hi, kind):
+        self.lo, self.hi, self.kind = lo, hi, kind
+        self.key = None
+        self.builds = 0
+
+    def ensure(self, entry, tick, long, shares):
+        import numpy as np
+        key = (entry, tick, long, shares)
+        if key == self.key:
+            return self
+        pct = np.arange(self.lo, self.hi + 1) / 10000.0
+        entry_a, tick_a, long_a, shares_a = (np.full(pct.shape, v) for v in (float(entry), float(tick), bool(long), float(shares)))
+        stop, _, target, _, risk, reward = _levels(TickGrid(tick_a), entry_a, long_a, pct, pct, shares_a)
+        price, (per_share, amount) = (stop, risk) if self.kind == "stop" else (target, reward)
+        sign = 100 if long else -100
+        move = (price / entry - 1.0) * sign if entry else np.zeros_like(price)
+
+        label = stop_label if self.kind == "stop" else target_label
+        self.price = price.tolist()
+        self.per_share = per_share.tolist()
+        self.amount = amount.tolist()
+        self.label = [label(p, m) for p, m in zip(self.price, move.tolist())]
+        self.amount_text = [f"{a:.0f}" for a in self.amount]
+        self.key = key
+        self.builds += 1
+        return self
+
+    def row(self, pos):
+        """(price, per_share, amount, label, amount_text) at slider position pos."""
+        i = min(max(pos, self.lo), self.hi) - self.lo
+        return self.price[i], self.per_share[i], self.amount[i], self.label[i], self.amount_text[i]
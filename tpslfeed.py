@@ -0,0 +1,228 @@
+# Cless TP/SL — price feeds (no Qt)
+# ----------------------------------------------------------------
+# Each feed runs on its own daemon thread, parses "symbol,price" lines
+# and pushes them into a TickCoalescer. The GUI drains the coalescer
+# once per frame, so a burst of ticks costs one update per symbol.
+#
+# Feed specs (for open_feed / --feed):
+#   replay:PATH[@SECONDS]  read a file from the start (optional delay per line)
+#   tail:PATH              follow a growing file, like tail -f
+#   pipe:PATH              named pipe / FIFO, reopened when the writer closes
+#   tcp:HOST:PORT          connect to a local line server
+#   udp:HOST:PORT          bind and read datagrams (one or more lines each)
+#
+# Alert sinks (open_sink / --alerts) write one line per level crossed:
+#   "time,symbol,kind,level,price,position"
+#   PATH | file:PATH       append to a log file
+#   udp:HOST:PORT          send a datagram per alert
+# ----------------------------------------------------------------
+
+import socket
+import threading
+import time
+
+
+class TickCoalescer:
+    """Latest price per symbol. Feeds push from any thread; the GUI drains."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = {}
+        self.received = 0    # ticks pushed
+        self.delivered = 0   # ticks handed out by drain()
+
+    def push(self, symbol, price):
+        with self._lock:
+            self._latest[symbol] = price
+            self.received += 1
+
+    def drain(self):
+        """All symbols that ticked since the last drain → {symbol: latest price}."""
+        with self._lock:
+            latest, self._latest = self._latest, {}
+            self.delivered += len(latest)
+        return latest
+
+
+def parse_line(line):
+    """'AAPL,189.25' → ('AAPL', 189.25); blank, comment or malformed lines → None."""
+    line = line.strip()
+    if not line or line.startswith("#"): return None
+    sym, sep, price = line.partition(",")
+    if not sep: return None
+    try:
+        return sym.strip(), float(price.split(",", 1)[0])
+    except ValueError:
+        return None
+
+
+class Feed(threading.Thread):
+    """Base feed: subclasses yield raw text lines from lines()."""
+    POLL = 0.25   # seconds between stop checks while idle
+
+    def __init__(self, coalescer=None):
+        super().__init__(daemon=True, name=type(self).__name__)
+        self.coalescer = coalescer or TickCoalescer()
+        self._stop_evt = threading.Event()
+        self.error = None
+
+    def lines(self):
+        raise NotImplementedError
+
+    @property
+    def stopped(self):
+        return self._stop_evt.is_set()
+
+    def stop(self):
+        self._stop_evt.set()
+
+    def run(self):
+        push = self.coalescer.push
+        try:
+            for line in self.lines():
+                if self.stopped: break
+                tick = parse_line(line)
+                if tick: push(*tick)
+        except OSError as e:
+            self.error = e
+
+
+class FileFeed(Feed):
+    """Lines from a file. follow=True keeps reading as it grows (tail -f);
+    interval > 0 sleeps between lines so a recorded session replays in time."""
+    def __init__(self, path, follow=False, from_start=True, interval=0.0, coalescer=None):
+        super().__init__(coalescer)
+        self.path, self.follow, self.from_start, self.interval = path, follow, from_start, interval
+
+    def lines(self):
+        with open(self.path, "rb") as f:
+            if not self.from_start:
+                f.seek(0, 2)
+            pending = b""
+            while not self.stopped:
+                chunk = f.readline()
+                if not chunk:
+                    if not self.follow:
+                        if pending: yield pending.decode("utf-8", errors="replace")
+                        return
+                    self._stop_evt.wait(0.01)
+                    continue
+                pending += chunk
+                if self.follow and not pending.endswith(b"\n"):
+                    continue   # partial line, wait for the rest
+                yield pending.decode("utf-8", errors="replace")
+                pending = b""
+                if self.interval: self._stop_evt.wait(self.interval)
+
+
+class PipeFeed(Feed):
+    """Named pipe (FIFO on POSIX, \\\\.\\pipe\\name on Windows); reopened on writer EOF."""
+    def __init__(self, path, coalescer=None):
+        super().__init__(coalescer)
+        self.path = path
+
+    def lines(self):
+        while not self.stopped:
+            with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+                yield from f
+            self._stop_evt.wait(0.05)
+
+
+class _SocketFeed(Feed):
+    def __init__(self, host, port, coalescer=None):
+        super().__init__(coalescer)
+        self.host, self.port = host, int(port)
+
+    def _split(self, buf, data):
+        buf += data.decode("utf-8", errors="replace")
+        *done, rest = buf.split("\n")
+        return done, rest
+
+
+class TCPFeed(_SocketFeed):
+    """Connects to a local line server; reconnects with backoff if it drops."""
+    def lines(self):
+        backoff = 0.2
+        while not self.stopped:
+            try:
+                with socket.create_connection((self.host, self.port), timeout=self.POLL) as s:
+                    backoff, buf = 0.2, ""
+                    while not self.stopped:
+                        try:
+                            data = s.recv(65536)
+                        except socket.timeout:
+                            continue
+                        if not data: break
+                        done, buf = self._split(buf, data)
+                        yield from done
+            except OSError:
+                pass
+            self._stop_evt.wait(backoff)
+            backoff = min(backoff * 2, 5.0)
+
+
+class UDPFeed(_SocketFeed):
+    """Binds HOST:PORT; every datagram may carry several lines."""
+    def lines(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.bind((self.host, self.port))
+            s.settimeout(self.POLL)
+            while not self.stopped:
+                try:
+                    data = s.recv(65536)
+                except socket.timeout:
+                    continue
+                yield from data.decode("utf-8", errors="replace").splitlines()
+
+
+def open_feed(spec, coalescer=None):
+    """Build (but do not start) a feed from a spec string; see the header for the forms."""
+    kind, _, rest = spec.partition(":")
+    kind = kind.lower()
+    try:
+        if kind == "replay":
+            path, _, delay = rest.rpartition("@") if "@" in rest else (rest, "", "")
+            return FileFeed(path, follow=False, interval=float(delay or 0), coalescer=coalescer)
+        if kind == "tail":
+            return FileFeed(rest, follow=True, from_start=False, coalescer=coalescer)
+        if kind == "pipe":
+            return PipeFeed(rest, coalescer=coalescer)
+        if kind in ("tcp", "udp"):
+            host, _, port = rest.rpartition(":")
+            cls = TCPFeed if kind == "tcp" else UDPFeed
+            return cls(host or "127.0.0.1", port, coalescer=coalescer)
+    except ValueError as e:   # a port or replay delay that isn't a number
+        raise ValueError(f"bad feed spec {spec!r}: {e}") from None
+    raise ValueError(f"unknown feed spec {spec!r} (use replay:, tail:, pipe:, tcp: or udp:)")
+
+
+class AlertSink:
+    """Writes level-cross alerts as CSV lines to a log file or a UDP address."""
+    def __init__(self, path=None, addr=None):
+        self.path, self.addr = path, addr
+        self._f = open(path, "a", encoding="utf-8", buffering=1) if path else None
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) if addr else None
+        self.sent = 0
+
+    def write(self, symbol, kind, level, price, pid):
+        line = f"{time.time():.3f},{symbol},{kind},{level:g},{price:g},{pid}\n"
+        try:
+            if self._f is not None:
+                self._f.write(line)
+            if self._sock is not None:
+                self._sock.sendto(line.encode("utf-8"), self.addr)
+            self.sent += 1
+        except OSError:
+            pass   # an alert must never take the GUI down
+
+    def close(self):
+        if self._f is not None: self._f.close()
+        if self._sock is not None: self._sock.close()
+
+
+def open_sink(spec):
+    """AlertSink from 'udp:HOST:PORT', 'file:PATH' or a plain path."""
+    kind, sep, rest = spec.partition(":")
+    if sep and kind.lower() == "udp":
+        host, _, port = rest.rpartition(":")
+        return AlertSink(addr=(host or "127.0.0.1", int(port)))
+    return AlertSink(path=rest if sep and kind.lower() == "file" else spec)
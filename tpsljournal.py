@@ -0,0 +1,319 @@
+# Cless TP/SL — trade journal (no Qt)
+# ----------------------------------------------------------------
+# Every planned and closed trade in one SQLite file: entry, stop,
+# target, shares, fees, and once closed the exit, realized R and P/L.
+# Indexed on symbol, open time and setup tag.
+#
+# Running aggregates live in a small stats table, one row per scope
+# (all trades, each symbol, each tag). Closing a trade folds it into
+# its three rows, so reading win rate / avg R / expectancy / max
+# drawdown never scans the trades. Trades are folded in close order
+# (closed time, then id): a close dated before the latest one (e.g.
+# imported history) refolds every row in the same commit, and
+# rebuild_stats() does the same if the table is ever edited by hand.
+#
+# Writes run in transactions; add_many() and `with journal.transaction():`
+# put any number of inserts/closes in one commit.
+#
+# Run:  python tpsljournal.py stats [--symbol AAPL] [--tag breakout]
+#       python tpsljournal.py import trades.csv     (columns as in log(); others ignored)
+#       python tpsljournal.py rebuild
+# DB:   --db PATH, else TPSL_JOURNAL, else ~/.cless_tpsl_journal.sqlite
+# ----------------------------------------------------------------
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+DEFAULT_PATH = os.environ.get("TPSL_JOURNAL", os.path.join(os.path.expanduser("~"), ".cless_tpsl_journal.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id            INTEGER PRIMARY KEY,
+    opened        REAL NOT NULL,            -- unix time
+    closed        REAL,                     -- NULL while open
+    symbol        TEXT NOT NULL DEFAULT '',
+    tag           TEXT NOT NULL DEFAULT '',
+    side          TEXT NOT NULL,            -- Long / Short
+    entry         REAL NOT NULL,
+    stop          REAL NOT NULL,
+    target        REAL NOT NULL,
+    shares        REAL NOT NULL,
+    flat_fee      REAL NOT NULL DEFAULT 0,
+    per_share_fee REAL NOT NULL DEFAULT 0,
+    exit          REAL,
+    R             REAL,                     -- NULL when stop == entry
+    pnl           REAL                      -- net of fees
+);
+CREATE INDEX IF NOT EXISTS trades_symbol ON trades(symbol, opened);
+CREATE INDEX IF NOT EXISTS trades_opened ON trades(opened);
+CREATE INDEX IF NOT EXISTS trades_tag ON trades(tag, opened);
+CREATE INDEX IF NOT EXISTS trades_open ON trades(opened) WHERE closed IS NULL;
+CREATE INDEX IF NOT EXISTS trades_closed ON trades(closed, id) WHERE closed IS NOT NULL;
+CREATE TABLE IF NOT EXISTS stats (
+    scope      TEXT PRIMARY KEY,            -- '' | 'symbol:XYZ' | 'tag:NAME'
+    trades     INTEGER NOT NULL,
+    wins       INTEGER NOT NULL,
+    sum_R      REAL NOT NULL,
+    sum_win_R  REAL NOT NULL,
+    sum_loss_R REAL NOT NULL,
+    sum_pnl    REAL NOT NULL,
+    peak_R     REAL NOT NULL,
+    max_dd_R   REAL NOT NULL,
+    peak_pnl   REAL NOT NULL,
+    max_dd_pnl REAL NOT NULL
+);
+"""
+
+TRADE_KEYS = ("symbol", "side", "entry", "stop", "target", "shares", "flat_fee", "per_share_fee", "tag", "opened",
+              "closed", "exit", "R", "pnl")
+LOG_KEYS = TRADE_KEYS[:-2]   # log()'s parameters
+
+
+def _side(side):
+    """'Long' / 'Short' from any case or L/S; ValueError otherwise."""
+    s = str(side).strip()[:1].lower()
+    if s not in ("l", "s"):
+        raise ValueError(f"side: expected Long or Short, got {side!r}")
+    return "Long" if s == "l" else "Short"
+
+
+def realized(side, entry, stop, shares, flat_fee, per_share_fee, exit):
+    """(R, net P/L) of a trade closed at exit. R is per share against the planned stop, None if that risk is 0."""
+    sgn = 1 if side == "Long" else -1
+    move = sgn * (exit - entry)
+    per_risk = abs(entry - stop)
+    R = move / per_risk if per_risk > 0 else None
+    return R, move * shares - (flat_fee + per_share_fee * shares)
+
+
+def _scopes(symbol, tag):
+    return ("", f"symbol:{symbol}", f"tag:{tag}")
+
+
+class Stat:
+    """Running aggregates of closed trades, in close order. Drawdowns are from the peak of cumulative R / P/L."""
+    FIELDS = ("trades", "wins", "sum_R", "sum_win_R", "sum_loss_R", "sum_pnl",
+              "peak_R", "max_dd_R", "peak_pnl", "max_dd_pnl")
+    __slots__ = FIELDS
+
+    def __init__(self, *values):
+        for k, v in zip(self.FIELDS, values or (0, 0) + (0.0,) * (len(self.FIELDS) - 2)):
+            setattr(self, k, v)
+
+    def add(self, R, pnl):
+        R = R or 0.0   # no planned risk: counts as a trade, moves no R
+        self.trades += 1
+        if R > 0:
+            self.wins += 1
+            self.sum_win_R += R
+        else:
+            self.sum_loss_R += R
+        self.sum_R += R
+        self.sum_pnl += pnl
+        self.peak_R = max(self.peak_R, self.sum_R)
+        self.max_dd_R = max(self.max_dd_R, self.peak_R - self.sum_R)
+        self.peak_pnl = max(self.peak_pnl, self.sum_pnl)
+        self.max_dd_pnl = max(self.max_dd_pnl, self.peak_pnl - self.sum_pnl)
+
+    def values(self):
+        return tuple(getattr(self, k) for k in self.FIELDS)
+
+    def summary(self):
+        n, w = self.trades, self.wins
+        return {
+            "trades": n,
+            "win_rate": w / n if n else 0.0,
+            "avg_R": self.sum_R / n if n else 0.0,
+            "avg_win_R": self.sum_win_R / w if w else 0.0,
+            "avg_loss_R": self.sum_loss_R / (n - w) if n - w else 0.0,
+            "expectancy": self.sum_pnl / n if n else 0.0,    # net P/L per trade
+            "total_pnl": self.sum_pnl,
+            "max_drawdown_R": self.max_dd_R,
+            "max_drawdown": self.max_dd_pnl,
+        }
+
+
+class Journal:
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_PATH
+        # autocommit mode: transactions are opened/closed explicitly in transaction()
+        self.db = sqlite3.connect(self.path, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._depth = 0
+        self._load_stats()
+
+    def close(self):
+        self.db.close()
+
+    def _load_stats(self):
+        self._stats = {r[0]: Stat(*r[1:]) for r in self.db.execute(f"SELECT scope, {', '.join(Stat.FIELDS)} FROM stats")}
+        self._dirty = set()
+        last = self.db.execute("SELECT closed, id FROM trades WHERE closed IS NOT NULL "
+                               "ORDER BY closed DESC, id DESC LIMIT 1").fetchone()
+        self._last = tuple(last) if last else (float("-inf"), 0)   # (closed, id) folded last
+        self._refold = False
+
+    @contextmanager
+    def transaction(self):
+        """One commit for everything inside (nests); stats rows are written with it."""
+        if self._depth == 0:
+            self.db.execute("BEGIN")
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self.db.execute("ROLLBACK")
+                self._load_stats()
+            raise
+        self._depth -= 1
+        if self._depth == 0:
+            if self._refold:
+                self._fold_all()
+            if self._dirty:
+                self.db.executemany(
+                    f"INSERT OR REPLACE INTO stats (scope, {', '.join(Stat.FIELDS)}) "
+                    f"VALUES (?{', ?' * len(Stat.FIELDS)})",
+                    [(s, *self._stats[s].values()) for s in self._dirty])
+                self._dirty.clear()
+            self.db.execute("COMMIT")
+
+    def _fold(self, symbol, tag, R, pnl, key):
+        """Add one closed trade to its scopes; key = (closed, id). Out of order → refold at commit."""
+        if key < self._last:
+            self._refold = True
+        else:
+            self._last = key
+        for scope in _scopes(symbol, tag):
+            st = self._stats.get(scope)
+            if st is None:
+                st = self._stats[scope] = Stat()
+            st.add(R, pnl)
+            self._dirty.add(scope)
+
+    # ---------- writes ----------
+    def log(self, symbol, side, entry, stop, target, shares, flat_fee=0.0, per_share_fee=0.0,
+            tag="", opened=None, exit=None, closed=None):
+        """Record a planned trade → its id. With exit, it is closed at once (e.g. imported history)."""
+        opened = time.time() if opened is None else opened
+        side = _side(side)
+        R = pnl = None
+        if exit is not None:
+            R, pnl = realized(side, entry, stop, shares, flat_fee, per_share_fee, exit)
+            closed = opened if closed is None else closed
+        with self.transaction():
+            tid = self.db.execute(
+                f"INSERT INTO trades ({', '.join(TRADE_KEYS)}) VALUES (?{', ?' * (len(TRADE_KEYS) - 1)})",
+                (symbol, side, entry, stop, target, shares, flat_fee, per_share_fee, tag, opened,
+                 closed if exit is not None else None, exit, R, pnl)).lastrowid
+            if exit is not None:
+                self._fold(symbol, tag, R, pnl, (closed, tid))
+        return tid
+
+    def add_many(self, trades):
+        """log() for an iterable of dicts with log()'s keyword names, in one transaction. Returns the count."""
+        n = 0
+        with self.transaction():
+            for t in trades:
+                self.log(**t)
+                n += 1
+        return n
+
+    def close_trade(self, tid, exit, closed=None):
+        """Close an open trade at exit → the updated trade row (dict). KeyError/ValueError if missing/closed."""
+        t = self.trade(tid)
+        if t is None:
+            raise KeyError(tid)
+        if t["closed"] is not None:
+            raise ValueError(f"trade {tid} is already closed")
+        R, pnl = realized(t["side"], t["entry"], t["stop"], t["shares"], t["flat_fee"], t["per_share_fee"], exit)
+        closed = time.time() if closed is None else closed
+        with self.transaction():
+            self.db.execute("UPDATE trades SET closed = ?, exit = ?, R = ?, pnl = ? WHERE id = ?",
+                            (closed, exit, R, pnl, tid))
+            self._fold(t["symbol"], t["tag"], R, pnl, (closed, tid))
+        return dict(t, closed=closed, exit=exit, R=R, pnl=pnl)
+
+    def rebuild_stats(self):
+        """Recompute every stats row from the closed trades, in close order."""
+        with self.transaction():
+            self._refold = True
+
+    def _fold_all(self):
+        self.db.execute("DELETE FROM stats")
+        self._stats, self._dirty, self._last, self._refold = {}, set(), (float("-inf"), 0), False
+        for t in self.db.execute("SELECT id, closed, symbol, tag, R, pnl FROM trades WHERE closed IS NOT NULL "
+                                 "ORDER BY closed, id"):
+            self._fold(t["symbol"], t["tag"], t["R"], t["pnl"], (t["closed"], t["id"]))
+
+    # ---------- reads ----------
+    def trade(self, tid):
+        row = self.db.execute("SELECT * FROM trades WHERE id = ?", (tid,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def trades(self, symbol=None, tag=None, since=None, until=None, open_only=False, limit=None):
+        """Trades newest first, filtered by symbol / tag / opened time range (each filter uses an index)."""
+        where, args = [], []
+        for col, val in (("symbol", symbol), ("tag", tag)):
+            if val is not None:
+                where.append(f"{col} = ?"); args.append(val)
+        if since is not None:
+            where.append("opened >= ?"); args.append(since)
+        if until is not None:
+            where.append("opened < ?"); args.append(until)
+        if open_only:
+            where.append("closed IS NULL")
+        sql = "SELECT * FROM trades" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY opened DESC, id DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(r) for r in self.db.execute(sql, args)]
+
+    def stats(self, symbol=None, tag=None):
+        """Aggregates for all trades, or one symbol / tag (symbol wins if both are given). No table scan."""
+        scope = f"symbol:{symbol}" if symbol is not None else f"tag:{tag}" if tag is not None else ""
+        return self._stats.get(scope, Stat()).summary()
+
+
+def _read_csv(path):
+    num = {"entry", "stop", "target", "shares", "flat_fee", "per_share_fee", "opened", "exit", "closed"}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {k: (float(v) if k in num else v) for k, v in row.items() if k in LOG_KEYS and v not in (None, "")}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="tpsljournal", description="Trade journal statistics and import.")
+    ap.add_argument("--db", default=None, help=f"journal file (default {DEFAULT_PATH})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("stats", help="print the running aggregates")
+    p.add_argument("--symbol"); p.add_argument("--tag")
+    p = sub.add_parser("import", help="add trades from a CSV (one transaction)")
+    p.add_argument("csv")
+    sub.add_parser("rebuild", help="recompute the stats table from the trades")
+    args = ap.parse_args(argv)
+
+    j = Journal(args.db)
+    try:
+        if args.cmd == "import":
+            print(f"{j.add_many(_read_csv(args.csv))} trades added", file=sys.stderr)
+        elif args.cmd == "rebuild":
+            j.rebuild_stats()
+        json.dump(j.stats(args.symbol, args.tag) if args.cmd == "stats" else j.stats(), sys.stdout, indent=2)
+        print()
+    finally:
+        j.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+# Cless TP/SL — local JSON API (no Qt)
+# ----------------------------------------------------------------
+# Run:  python tpslserver.py                     # http://127.0.0.1:8765
+#       python tpslserver.py --unix /tmp/tpsl.sock
+#       python tpslcalculator.py --serve 8765     # same API inside the GUI:
+#                                                 # pushed positions show in Portfolio
+#
+# HTTP/1.1 with keep-alive; pipelined requests are answered in order.
+# Bodies and replies are JSON. Inputs use the batch/settings units:
+#   entry, current, shares, tick, side ("Long"/"Short"), stop_pct,
+#   target_pct (percents, -4 = -4 %), flat_fee, per_share_fee
+# Missing fields take the DEFAULTS values.
+#
+#   POST /plan            one setup → plan (+ optional "stop" price override)
+#   POST /plan/batch      [setups] → [plans], or {column: [values]} → {column: [values]}
+#   POST /tp_r            setup + "R" → {"target_pct", "target"}  (the TP = nR buttons)
+#   POST /breakeven       setup → {"breakeven"}
+#   GET  /positions       every position with its plan
+#   POST /positions       setup + "symbol" → the new position
+#   PATCH /positions/ID   changed fields → the position
+#   DELETE /positions/ID
+#   POST /prices          {"SYM": price, ...} → positions updated + levels crossed
+# ----------------------------------------------------------------
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import threading
+from concurrent.futures import Future
+
+import tpslcore as core
+
+DEFAULT_PORT = 8765
+MAX_BODY = 64 * 1024 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+INPUT_KEYS = ("entry", "current", "shares", "tick", "stop_pct", "target_pct", "flat_fee", "per_share_fee")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def finite(name, value):
+    """float(value), or HTTP 400 unless it is a finite number (no NaN / inf / 1e400)."""
+    try:
+        x = float(value)
+    except (TypeError, ValueError) as e:
+        raise HTTPError(400, f"{name}: bad number: {e}")
+    if not math.isfinite(x):
+        raise HTTPError(400, f"{name}: not a finite number: {value!r}")
+    return x
+
+
+def plan_inputs(obj):
+    """JSON setup (percents, side text) → core.plan() keyword arguments."""
+    if not isinstance(obj, dict):
+        raise HTTPError(400, "expected a JSON object")
+    d = core.DEFAULTS
+    v = {k: finite(k, obj.get(k, d[k])) for k in INPUT_KEYS if k != "current"}
+    v["current"] = finite("current", obj["current"]) if "current" in obj else v["entry"]   # as tpslbatch
+    side = str(obj.get("side", d["side"]))
+    return dict(entry=v["entry"], current=v["current"], shares=v["shares"], tick=v["tick"],
+                long=side[:1].lower() == "l", stop_pct=v["stop_pct"] / 100, tgt_pct=v["target_pct"] / 100,
+                flat_fee=v["flat_fee"], ps_fee=v["per_share_fee"])
+
+
+def _run_now(fn, *args):
+    """Default submit(): run on the server thread, result as a completed Future."""
+    fut = Future()
+    try:
+        fut.set_result(fn(*args))
+    except Exception as e:
+        fut.set_exception(e)
+    return fut
+
+
+class Service:
+    """The endpoints. Pure math runs on the server thread; anything touching the
+    position book goes through submit(fn, *args) → Future, so an embedding GUI
+    can run it on its own thread. `book` follows core.Portfolio's interface.
+    """
+    def __init__(self, book=None, submit=None):
+        self.book = book if book is not None else core.Portfolio()
+        self.submit = submit or _run_now
+        self.requests = 0
+
+    # ---------- math ----------
+    def plan(self, body):
+        kw = plan_inputs(body)
+        stop = body.get("stop")
+        return core.plan(**kw, stop=None if stop is None else finite("stop", stop))
+
+    def plan_batch(self, body):
+        """Same keys per setup as /plan (tpslbatch.plan_chunk with every plan_batch column)."""
+        import tpslbatch
+        if isinstance(body, list):
+            if not all(isinstance(row, dict) for row in body):
+                raise HTTPError(400, "every setup in the list must be a JSON object")
+            cols = {k: [row.get(k, core.DEFAULTS[k]) for row in body] for k in INPUT_KEYS + ("side",)}
+            cols["current"] = [row.get("current", e) for row, e in zip(body, cols["entry"])]
+            out = tpslbatch.plan_chunk(_finite_columns(cols), len(body), None)
+            lists = {k: v.tolist() for k, v in out.items()}
+            return [dict(zip(lists, vals)) for vals in zip(*lists.values())]
+        if isinstance(body, dict):
+            lens = {len(v) for v in body.values() if isinstance(v, list)}
+            if len(lens) != 1:
+                raise HTTPError(400, "columns must be lists of one common length")
+            cols = {k: v for k, v in body.items() if k in INPUT_KEYS + ("side",)}
+            return {k: v.tolist() for k, v in tpslbatch.plan_chunk(_finite_columns(cols), lens.pop(), None).items()}
+        raise HTTPError(400, "expected a list of setups or an object of columns")
+
+    def tp_r(self, body):
+        kw = plan_inputs(body)
+        pct = core.target_pct_for_r(kw["entry"], kw["stop_pct"], kw["long"], kw["tick"], finite("R", body.get("R", 1)))
+        if pct is None:
+            return {"target_pct": None, "target": None}
+        # the slider holds whole basis points, exactly as TPSLWidget.set_tp_R stores it
+        pct = int(pct * 100 * 100) / 10000.0
+        return {"target_pct": pct * 100, "target": core.target_price(kw["entry"], pct, kw["long"], kw["tick"])}
+
+    def breakeven(self, body):
+        kw = plan_inputs(body)
+        fees = kw["flat_fee"] + kw["ps_fee"] * kw["shares"]
+        return {"breakeven": core.breakeven_price(kw["entry"], kw["shares"], fees, kw["long"], kw["tick"])}
+
+    # ---------- positions (through submit) ----------
+    def _position(self, pid):
+        pos, res = self.book.positions[pid], self.book.rows[pid]
+        return {
+            "id": pid, "symbol": pos["symbol"], "side": "Long" if pos["long"] else "Short",
+            "entry": pos["entry"], "current": pos["current"], "shares": pos["shares"], "tick": pos["tick"],
+            "stop_pct": pos["stop_pct"] * 100, "target_pct": pos["tgt_pct"] * 100,
+            "flat_fee": pos["flat_fee"], "per_share_fee": pos["ps_fee"], **res,
+        }
+
+    def _get(self, pid):
+        if pid not in self.book.positions:
+            raise HTTPError(404, f"no position {pid}")
+        return self._position(pid)
+
+    def _list(self):
+        return {"positions": [self._position(pid) for pid in list(self.book.positions)],
+                "totals": dict(self.book.totals)}
+
+    def _add(self, body):
+        kw = plan_inputs(body)
+        return self._position(self.book.add(str(body.get("symbol", "")), **kw))
+
+    def _update(self, pid, body):
+        if pid not in self.book.positions:
+            raise HTTPError(404, f"no position {pid}")
+        full = dict(self._position(pid), **body)
+        changes = {k: v for k, v in plan_inputs(full).items() if k in _changed_keys(body)}
+        if "symbol" in body: changes["symbol"] = str(body["symbol"])
+        self.book.update(pid, **changes)
+        return self._position(pid)
+
+    def _remove(self, pid):
+        if pid not in self.book.positions:
+            raise HTTPError(404, f"no position {pid}")
+        self.book.remove(pid)
+        return {"removed": pid}
+
+    def _prices(self, body):
+        if not isinstance(body, dict):
+            raise HTTPError(400, "expected {symbol: price}")
+        updated, crossed = [], []
+        prices = {sym: finite(sym, price) for sym, price in body.items()}   # all checked before any moves
+        for sym, price in prices.items():
+            crossed += [{"symbol": sym, "price": price, "level": lv, "position": pid, "kind": kind}
+                        for lv, pid, kind in self.book.levels.move(sym, price)]
+            updated += self.book.set_price(sym, price)
+        return {"updated": updated, "crossed": crossed}
+
+    # ---------- routing ----------
+    async def dispatch(self, method, path, body):
+        self.requests += 1
+        path = path.split("?", 1)[0].rstrip("/") or "/"
+        pure = {"/plan": self.plan, "/plan/batch": self.plan_batch, "/tp_r": self.tp_r, "/breakeven": self.breakeven}
+        if path in pure:
+            if method != "POST": raise HTTPError(405, "use POST")
+            return pure[path](body)
+
+        if path == "/positions":
+            if method == "GET": fn, args = self._list, ()
+            elif method == "POST": fn, args = self._add, (body,)
+            else: raise HTTPError(405, "use GET or POST")
+        elif path.startswith("/positions/"):
+            try:
+                pid = int(path.rsplit("/", 1)[1])
+            except ValueError:
+                raise HTTPError(404, "position ids are integers")
+            if method in ("PATCH", "PUT"): fn, args = self._update, (pid, body)
+            elif method == "DELETE": fn, args = self._remove, (pid,)
+            elif method == "GET": fn, args = self._get, (pid,)
+            else: raise HTTPError(405, "use GET, PATCH or DELETE")
+        elif path == "/prices":
+            if method != "POST": raise HTTPError(405, "use POST")
+            fn, args = self._prices, (body,)
+        else:
+            raise HTTPError(404, f"no endpoint {path}")
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+
+def _finite_columns(cols):
+    """Numeric batch columns as float arrays; HTTP 400 naming the first non-finite cell."""
+    import numpy as np
+    out = dict(cols)
+    for k in INPUT_KEYS:
+        if k not in cols: continue
+        try:
+            a = np.asarray(cols[k], dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            raise HTTPError(400, f"{k}: bad number: {e}")
+        bad = np.flatnonzero(~np.isfinite(a))
+        if len(bad):
+            raise HTTPError(400, f"{k}[{bad[0]}]: not a finite number")
+        out[k] = a
+    return out
+
+
+def _changed_keys(body):
+    """plan() argument names touched by a PATCH body (JSON names → plan names)."""
+    rename = {"target_pct": "tgt_pct", "per_share_fee": "ps_fee", "side": "long"}
+    return {rename.get(k, k) for k in body}
+
+
+# ---------- HTTP ----------
+def _reply(status, obj, keep_alive):
+    body = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            + ("" if keep_alive else "Connection: close\r\n") + "\r\n")
+    return head.encode("latin-1") + body
+
+
+class Server:
+    """asyncio HTTP server for a Service on TCP host:port or a Unix socket."""
+    def __init__(self, service=None, host="127.0.0.1", port=DEFAULT_PORT, unix=None):
+        self.service = service or Service()
+        self.host, self.port, self.unix = host, port, unix
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.unix or f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        if self.unix:
+            self._server = await asyncio.start_unix_server(self._connection, path=self.unix)
+        else:
+            self._server = await asyncio.start_server(self._connection, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]   # port 0 → the one picked
+        return self
+
+    def start_thread(self):
+        """Serve from a daemon thread with its own event loop; returns once listening."""
+        ready, failed = threading.Event(), []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.start())
+            except OSError as e:
+                failed.append(e); ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+        self._thread = threading.Thread(target=run, daemon=True, name="tpslserver")
+        self._thread.start()
+        ready.wait()
+        if failed:
+            raise failed[0]
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    writer.write(_reply(400, {"error": "bad request line"}, False))
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if not h.strip():
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                conn = headers.get("connection", "").lower()
+                keep = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+
+                if "chunked" in headers.get("transfer-encoding", "").lower():
+                    writer.write(_reply(411, {"error": "send Content-Length, not chunked"}, False))
+                    break
+                try:
+                    n = int(headers.get("content-length", "0") or 0)
+                    if n < 0: raise ValueError
+                except ValueError:   # can't tell where the body ends: answer and close
+                    writer.write(_reply(400, {"error": "bad Content-Length"}, False))
+                    break
+                if n > MAX_BODY:
+                    writer.write(_reply(413, {"error": "body too large"}, False))
+                    break
+                raw = await reader.readexactly(n) if n else b""
+
+                try:
+                    body = json.loads(raw) if raw.strip() else {}
+                    status, obj = 200, await self.service.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, obj = e.status, {"error": str(e)}
+                except (ValueError, KeyError, TypeError, OverflowError) as e:
+                    status, obj = 400, {"error": f"{type(e).__name__}: {e}"}
+                except Exception as e:   # keep serving; report it to this caller only
+                    status, obj = 500, {"error": f"{type(e).__name__}: {e}"}
+                writer.write(_reply(status, obj, keep))
+                await writer.drain()
+                if not keep:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="tpslserver", description="Serve the TP/SL math as local HTTP/JSON.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    args = ap.parse_args(argv)
+    server = Server(host=args.host, port=args.port, unix=args.unix)
+    try:
+        asyncio.run(_serve(server))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"tpslserver: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+async def _serve(server):
+    await server.start()
+    print(f"tpslserver: listening on {server.address}", file=sys.stderr)
+    async with server._server:
+        await server._server.serve_forever()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+# Cless TP/SL — Monte Carlo hit probabilities (no Qt)
+# ----------------------------------------------------------------
+# Simulates price paths from entry (or the current price of an open
+# trade) and records which level each path touches first: target,
+# stop, or neither by the end of the horizon (marked to market at the
+# last step). R is in units of the initial risk, so a trailed stop past
+# entry scores the profit it locks in.
+#
+# Paths come from GBM (vol / drift over the horizon) or are bootstrapped
+# from a file of per-step returns. They are generated in NumPy blocks;
+# large runs fan blocks out over a ProcessPoolExecutor. Every block has
+# its own child seed (SeedSequence.spawn), so a seed gives the same
+# answer no matter how many workers run it.
+#
+# Run:  python tpslsim.py --entry 115 --stop -4 --target 8 --paths 1000000
+# ----------------------------------------------------------------
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import tpslcore as core
+
+BLOCK_PATHS = 16384   # paths per block: ~13 MB of float32 at 200 steps
+
+
+def load_returns(path):
+    """Per-step returns from .npy or a one-column text/CSV file (non-numeric lines skipped)."""
+    if path.lower().endswith(".npy"):
+        return np.asarray(np.load(path), dtype=np.float64).ravel()
+    vals = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                vals.append(float(line.split(",")[-1]))
+            except ValueError:
+                continue
+    return np.asarray(vals, dtype=np.float64)
+
+
+def _run_block(task):
+    """Simulate one block → (n, n_target, n_stop, sum_R, sum_R²). Top-level so it pickles."""
+    seed, n, steps, mu, sigma, log_returns, lo, hi, long, r_target, r_stop, start_log, per_risk_frac = task
+    rng = np.random.default_rng(seed)
+    if log_returns is None:
+        z = rng.standard_normal((n, steps), dtype=np.float32)
+        z *= np.float32(sigma)
+        z += np.float32(mu)
+    else:
+        z = log_returns[rng.integers(0, len(log_returns), (n, steps))]
+    lp = np.cumsum(z, axis=1, out=z)   # log(price / start) along each path
+
+    # first step at or beyond each level (steps = never)
+    up = lp >= hi
+    dn = lp <= lo
+    first_up = np.where(up.any(axis=1), up.argmax(axis=1), steps)
+    first_dn = np.where(dn.any(axis=1), dn.argmax(axis=1), steps)
+    tgt_first, stop_first = (first_up, first_dn) if long else (first_dn, first_up)
+
+    hit_t = tgt_first < stop_first               # a tie inside one step counts as the stop
+    hit_s = (stop_first <= tgt_first) & (stop_first < steps)
+    end_move = np.expm1(lp[:, -1].astype(np.float64) + start_log)   # vs entry
+    R = np.where(hit_t, r_target, np.where(hit_s, r_stop, (end_move if long else -end_move) / per_risk_frac))
+    return n, int(hit_t.sum()), int(hit_s.sum()), float(R.sum()), float(np.square(R).sum())
+
+
+def simulate(entry, stop, target, long=True, shares=1, flat_fee=0.0, ps_fee=0.0,
+             paths=100_000, steps=200, vol=0.02, drift=0.0, returns=None,
+             seed=None, workers=1, block=BLOCK_PATHS, start=None, risk=None, executor=None):
+    """Probability of target-before-stop plus expected R and P/L for one setup.
+
+    vol / drift are over the whole horizon (e.g. 0.02 = 2 % daily vol for a
+    one-day horizon of `steps` bars). Pass `returns` (per-step simple returns)
+    to bootstrap instead of GBM. workers > 1 (or None = all cores) spreads
+    blocks over processes. Fees are charged once per trade, as in recalc().
+    executor: a long-lived ProcessPoolExecutor to run the blocks on instead
+    of starting one per call (workers should then be its size).
+
+    start: price the paths begin at (default entry), e.g. the current price of
+    an open trade. risk: per-share risk that 1R stands for (default |entry − stop|);
+    with a trailed stop pass the initial one, so a stop past entry scores its
+    signed R (a locked-in profit) instead of −1.
+    """
+    t0 = time.perf_counter()
+    start = entry if start is None else start
+    per_risk = abs(entry - stop) if risk is None else risk
+    sgn = 1 if long else -1
+    if entry <= 0 or start <= 0 or per_risk <= 0 or stop <= 0 or target <= 0:
+        raise ValueError("need entry, stop and target > 0 and a risk > 0")
+
+    dt = 1.0 / steps
+    sigma = vol * math.sqrt(dt)
+    mu = (drift - 0.5 * vol * vol) * dt
+    lo, hi = sorted((math.log(stop / start), math.log(target / start)))
+    if returns is not None:
+        returns = np.log1p(np.asarray(returns, dtype=np.float64)).astype(np.float32)
+
+    n_blocks = max(1, math.ceil(paths / block))
+    seeds = np.random.SeedSequence(seed).spawn(n_blocks)
+    sizes = [block] * (n_blocks - 1) + [paths - block * (n_blocks - 1)]
+    r_target, r_stop = sgn * (target - entry) / per_risk, sgn * (stop - entry) / per_risk
+    tasks = [(s, n, steps, mu, sigma, returns, lo, hi, long, r_target, r_stop, math.log(start / entry), per_risk / entry)
+             for s, n in zip(seeds, sizes)]
+
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    chunksize = max(1, n_blocks // (4 * workers))
+    if executor is not None and n_blocks > 1:
+        parts = list(executor.map(_run_block, tasks, chunksize=chunksize))
+    elif workers > 1 and n_blocks > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, n_blocks)) as ex:
+            parts = list(ex.map(_run_block, tasks, chunksize=chunksize))
+    else:
+        parts = [_run_block(t) for t in tasks]
+
+    n, n_t, n_s, s_r, s_r2 = (sum(col) for col in zip(*parts))
+    exp_r = s_r / n
+    fees = flat_fee + ps_fee * shares
+    return {
+        "paths": n,
+        "p_target": n_t / n,
+        "p_stop": n_s / n,
+        "p_open": (n - n_t - n_s) / n,
+        "exp_R": exp_r,
+        "exp_R_stderr": math.sqrt(max(s_r2 / n - exp_r * exp_r, 0.0) / n),
+        "exp_pl": exp_r * per_risk * shares - fees,
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="tpslsim", description="Monte Carlo TP/SL hit probability and expectancy.")
+    ap.add_argument("--entry", type=float, default=core.DEFAULTS["entry"])
+    ap.add_argument("--side", default=core.DEFAULTS["side"], choices=["Long", "Short"])
+    ap.add_argument("--stop", type=float, default=core.DEFAULTS["stop_pct"], help="stop %% from entry, as on the slider")
+    ap.add_argument("--target", type=float, default=core.DEFAULTS["target_pct"], help="target %% from entry")
+    ap.add_argument("--current", type=float, default=None, help="start the paths here (default: entry)")
+    ap.add_argument("--tick", type=float, default=core.DEFAULTS["tick"])
+    ap.add_argument("--shares", type=int, default=core.DEFAULTS["shares"])
+    ap.add_argument("--flat-fee", type=float, default=0.0)
+    ap.add_argument("--per-share-fee", type=float, default=0.0)
+    ap.add_argument("--paths", type=int, default=1_000_000)
+    ap.add_argument("--steps", type=int, default=200)
+    ap.add_argument("--vol", type=float, default=2.0, help="volatility %% over the horizon (GBM)")
+    ap.add_argument("--drift", type=float, default=0.0, help="drift %% over the horizon (GBM)")
+    ap.add_argument("--returns", help="bootstrap per-step returns from this .npy/.csv instead of GBM")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    args = ap.parse_args(argv)
+
+    long = args.side == "Long"
+    res = core.plan(args.entry, args.entry, args.shares, args.tick, long, args.stop / 100, args.target / 100)
+    out = simulate(args.entry, res["stop"], res["target"], long, args.shares, args.flat_fee, args.per_share_fee,
+                   paths=args.paths, steps=args.steps, vol=args.vol / 100, drift=args.drift / 100,
+                   returns=load_returns(args.returns) if args.returns else None,
+                   seed=args.seed, workers=args.workers, start=args.current)
+    out.update(stop=res["stop"], target=res["target"], R=res["R"])
+    json.dump(out, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())